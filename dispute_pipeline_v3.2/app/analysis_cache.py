@@ -0,0 +1,103 @@
+"""
+Bounded LRU of ready-to-send /api/analysis responses.
+
+Each entry holds the serialized JSON body (same bytes FastAPI would
+produce from the parsed file), plus an ETag and Last-Modified value.
+
+Freshness:
+- every lookup does one `stat()`; if mtime or size changed, the entry
+  is reloaded (covers files written by the CLI / batch runs)
+- `invalidate(path)` is called by the API after it writes an analysis
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class CachedAnalysis:
+    __slots__ = ("body", "etag", "last_modified", "mtime_ns", "size")
+
+    def __init__(self, body: bytes, mtime_ns: int, size: int):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.last_modified = formatdate(mtime_ns / 1e9, usegmt=True)
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+
+def render_json(data) -> bytes:
+    """Same encoding as FastAPI's default JSONResponse."""
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedAnalysis]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def load(self, path: Path, store: bool = True) -> Optional[CachedAnalysis]:
+        """
+        Return the cached response for `path`, or None if the file does not exist.
+
+        `store=False` serves hits from the LRU but does not insert misses
+        (bulk exports should not evict the entries the dashboard polls).
+        """
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        # Miss (or stale): parse once, keep the serialized bytes
+        data = json.loads(path.read_text(encoding="utf-8"))
+        entry = CachedAnalysis(render_json(data), st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            self.misses += 1
+            if not store:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path: Path):
+        with self._lock:
+            if self._entries.pop(str(path), None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
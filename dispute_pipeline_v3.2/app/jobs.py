@@ -0,0 +1,176 @@
+"""
+In-process job queue for running the pipeline from the API.
+
+- One shared asyncio.Queue + a fixed number of worker tasks (started in
+  the app lifespan), so slow model calls never occupy uvicorn threads.
+- Concurrent requests for the same case are de-duplicated: while a job
+  for `case_id` is queued or running, submitting the same payload (same
+  model, same body) again returns that job; a different payload raises
+  JobConflict instead of being dropped.
+- Every job keeps a small change counter so SSE subscribers can wait for
+  the next status update without polling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pipeline.logs import get_logger
+
+log = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs kept in memory for polling
+MAX_FINISHED_JOBS = 1000
+
+
+class Job:
+    def __init__(self, case_id: str, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.case_id = case_id
+        self.payload = payload
+        self.fingerprint = payload_fingerprint(payload)
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def _set_status(self, status: str):
+        self.status = status
+        self.version += 1
+        # Wake current waiters, then arm a fresh event for the next change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_change(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the next status change. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "caseId": self.case_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+Handler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobConflict(Exception):
+    """A job for the case is already queued / running with a different payload."""
+
+    def __init__(self, active: Job):
+        super().__init__(f"Job {active.id} for {active.case_id} is {active.status} with a different payload")
+        self.active = active
+
+
+def payload_fingerprint(payload: Dict[str, Any]) -> str:
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    def __init__(self, handler: Handler, workers: int = 4):
+        self.handler = handler
+        self.workers = max(1, workers)
+
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_case: Dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"job-worker-{i}"))
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    # -----------------------------
+    # Submit / lookup
+    # -----------------------------
+    def submit(self, case_id: str, payload: Dict[str, Any]) -> tuple[Job, bool]:
+        """
+        Queue a job for `case_id`. Returns (job, created); `created` is False
+        when the same payload for the case is already queued or running.
+        Raises JobConflict if the active job has a different payload.
+        """
+        job = Job(case_id, payload)
+        active = self._active_by_case.get(case_id)
+        if active is not None and not active.finished:
+            if active.fingerprint == job.fingerprint:
+                return active, False
+            raise JobConflict(active)
+
+        self._jobs[job.id] = job
+        self._active_by_case[case_id] = job
+        self._queue.put_nowait(job)
+        self._prune()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job.id, None)
+
+    # -----------------------------
+    # Worker loop
+    # -----------------------------
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                job.started_at = time.time()
+                job._set_status(RUNNING)
+                job.result = await self.handler(job)
+                job.finished_at = time.time()
+                job._set_status(DONE)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.finished_at = time.time()
+                job._set_status(FAILED)
+                log.exception("job %s for %s failed", job.id, job.case_id)
+            finally:
+                if self._active_by_case.get(job.case_id) is job:
+                    del self._active_by_case[job.case_id]
+                self._queue.task_done()
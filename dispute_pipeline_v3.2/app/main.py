@@ -1,9 +1,119 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 from pathlib import Path
+import asyncio
 import json
+import os
+import re
+import sys
+import weakref
 
-app = FastAPI()
+# src/ holds the `pipeline` package (same layout the CLI scripts use)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipeline.llm_clients import client_stats, shutdown_clients  # noqa: E402
+from pipeline.stage2_cache import Stage2Cache  # noqa: E402
+from pipeline.stage2_llm import STAGE2_PROMPT_VERSION  # noqa: E402
+from pipeline.tracing import prometheus_text, span  # noqa: E402
+from pipeline.logs import configure_logging, get_logger, shutdown_logging  # noqa: E402
+from pipeline.trigger_service import TriggerService  # noqa: E402
+from pipeline.residency import WARMUP_ON_START, warm_models  # noqa: E402
+from pipeline.config import get_config  # noqa: E402
+from pipeline.ratelimit import governor_stats  # noqa: E402
+from arbitration_pipeline import analyze_case_async, update_case_async, write_json_atomic  # noqa: E402
+from app.jobs import Job, JobConflict, JobQueue  # noqa: E402
+from app.analysis_cache import AnalysisCache  # noqa: E402
+
+SOURCE_DIR = Path("data/source")
+ANALYSIS_DIR = Path("data/analysis")
+CACHE_DB = Path("data/cache/stage2_cache.sqlite")
+
+# Stage 2 model: PIPELINE_MODEL, else stage2_model from the PIPELINE_CONFIG file (default gemma3:1b)
+DEFAULT_MODEL = os.getenv("PIPELINE_MODEL") or get_config().stage2_model
+JOB_WORKERS = int(os.getenv("PIPELINE_JOB_WORKERS", "4"))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+# 1 → deadlines already in the past fire right away (cases seeded on startup,
+#     and backdated / imported messages posted later); 0 → they are skipped
+TRIGGER_CATCH_UP = os.getenv("SUMMARY_TRIGGER_CATCH_UP", "0") == "1"
+
+_CASE_ID = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+analysis_cache = AnalysisCache(max_entries=ANALYSIS_CACHE_SIZE)
+
+
+def _check_case_id(case_id) -> str:
+    if not isinstance(case_id, str) or not _CASE_ID.match(case_id):
+        raise HTTPException(status_code=422, detail=f"Invalid case id: {case_id!r}")
+    return case_id
+
+
+# ========== Pipeline job handler ==========
+
+def _write_analysis(case_id: str, analysis: dict) -> Path:
+    ANALYSIS_DIR.mkdir(exist_ok=True, parents=True)
+    out_path = ANALYSIS_DIR / f"{case_id}_analysis.json"
+    with span("file_write"):
+        write_json_atomic(out_path, analysis)
+    analysis_cache.invalidate(out_path)
+    return out_path
+
+
+# Full runs, incremental updates and summary triggers all read-modify-write
+# the case files → one at a time per case. Weak values: a lock disappears
+# once nobody holds or waits on it, so the map does not grow per case forever.
+_update_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _case_lock(case_id: str) -> asyncio.Lock:
+    return _update_locks.setdefault(case_id, asyncio.Lock())
+
+
+async def _run_pipeline_job(job: Job) -> dict:
+    async with _case_lock(job.case_id):
+        raw = job.payload.get("raw")
+        if raw is None:
+            raw_path = SOURCE_DIR / f"{job.case_id}_raw.json"
+            raw = json.loads(await asyncio.to_thread(raw_path.read_text, encoding="utf-8"))
+
+        analysis = await analyze_case_async(
+            raw,
+            model_name=job.payload["model"],
+            case_id=job.case_id,
+            stage2_cache=app.state.stage2_cache,
+        )
+        await asyncio.to_thread(_write_analysis, job.case_id, analysis)
+
+    return {"analysisUrl": f"/api/analysis/{job.case_id}", "analysis": analysis}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    app.state.stage2_cache = Stage2Cache(CACHE_DB, prompt_version=STAGE2_PROMPT_VERSION)
+    app.state.jobs = JobQueue(_run_pipeline_job, workers=JOB_WORKERS)
+    app.state.jobs.start()
+    app.state.triggers = TriggerService(on_fire=_on_trigger)
+    await asyncio.to_thread(_seed_triggers, app.state.triggers)
+    trigger_task = asyncio.create_task(app.state.triggers.run())
+    # Load local models now, not on the first request (in the background)
+    warmup = asyncio.create_task(asyncio.to_thread(warm_models, [DEFAULT_MODEL, get_config().stage3_model])) if WARMUP_ON_START else None
+    yield
+    trigger_task.cancel()
+    await asyncio.gather(trigger_task, *_trigger_tasks.values(), return_exceptions=True)
+    if warmup is not None:
+        await asyncio.gather(warmup, return_exceptions=True)
+    await app.state.jobs.stop()
+    app.state.stage2_cache.close()
+    # Close pooled LLM connections shared with the pipeline stages
+    shutdown_clients()
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ========== CORS ==========
 app.add_middleware(
@@ -16,15 +126,321 @@ app.add_middleware(
 
 # ========== API：讀取分析結果 ==========
 
+def _not_modified(request: Request, etag: str, mtime_ns: int) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = {t.strip() for t in inm.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(mtime_ns // 1_000_000_000) <= int(parsedate_to_datetime(ims).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
 @app.get("/api/analysis/{case_id}")
-def get_analysis(case_id: str):
+def get_analysis(case_id: str, request: Request):
     file_path = Path(f"data/analysis/{case_id}_analysis.json")
 
-    if not file_path.exists():
+    entry = analysis_cache.load(file_path)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"No analysis found for {case_id}")
 
-    return json.loads(file_path.read_text(encoding="utf-8"))
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": entry.last_modified,
+        "Cache-Control": "no-cache",   # 每次都回來驗證，但可拿到 304
+    }
+    if _not_modified(request, entry.etag, entry.mtime_ns):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# ========== API：批次讀取分析結果（NDJSON streaming） ==========
+
+_ANALYSIS_SUFFIX = "_analysis.json"
+
+
+def _parse_since(since: str) -> float:
+    """Epoch seconds, or ISO 8601 (naive = UTC)."""
+    try:
+        return float(since)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid since: {since!r}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _modified_since(since_ts: float):
+    """Case IDs whose analysis file changed after `since_ts`, oldest first."""
+    found = []
+    with os.scandir(ANALYSIS_DIR) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith(_ANALYSIS_SUFFIX):
+                mtime = e.stat().st_mtime
+                if mtime > since_ts:
+                    found.append((mtime, e.name[: -len(_ANALYSIS_SUFFIX)]))
+    found.sort()
+    return [case_id for _, case_id in found]
+
+
+def _all_case_ids():
+    if not ANALYSIS_DIR.is_dir():
+        return []
+    return sorted(p.name[: -len(_ANALYSIS_SUFFIX)] for p in ANALYSIS_DIR.glob(f"*{_ANALYSIS_SUFFIX}"))
+
+
+def _ndjson_lines(case_ids):
+    """
+    One line per case. `analysis` is byte-for-byte the body that
+    GET /api/analysis/{case_id} returns; files are read one at a time.
+    """
+    for case_id in case_ids:
+        head = json.dumps({"caseId": case_id}, ensure_ascii=False, separators=(",", ":"))[:-1].encode("utf-8")
+        entry = analysis_cache.load(ANALYSIS_DIR / f"{case_id}{_ANALYSIS_SUFFIX}", store=False)
+        if entry is None:
+            yield head + b',"error":"not_found"}\n'
+        else:
+            yield (
+                head
+                + b',"lastModified":' + json.dumps(entry.last_modified).encode("utf-8")
+                + b',"analysis":' + entry.body + b"}\n"
+            )
+
+
+@app.get("/api/analyses")
+def get_analyses(ids: str | None = None, since: str | None = None):
+    """
+    Stream many analyses as NDJSON.
+
+    - ?ids=case1,case2   → those cases, in the given order
+    - ?since=<epoch|ISO> → every analysis modified after that time (oldest first)
+    - neither            → the whole data/analysis directory
+    """
+    if ids:
+        case_ids = [c.strip() for c in ids.split(",") if c.strip()]
+        for c in case_ids:
+            _check_case_id(c)
+        if since:
+            since_ts = _parse_since(since)
+            case_ids = [
+                c for c in case_ids
+                if (ANALYSIS_DIR / f"{c}{_ANALYSIS_SUFFIX}").exists()
+                and (ANALYSIS_DIR / f"{c}{_ANALYSIS_SUFFIX}").stat().st_mtime > since_ts
+            ]
+    elif since:
+        case_ids = _modified_since(_parse_since(since))
+    else:
+        case_ids = _all_case_ids()
+
+    return StreamingResponse(_ndjson_lines(case_ids), media_type="application/x-ndjson")
+
+
+# ========== API：在伺服器內執行 pipeline ==========
+
+def _sse_event(job: Job) -> str:
+    return f"event: {job.status}\ndata: {json.dumps(job.as_dict(), ensure_ascii=False)}\n\n"
+
+
+async def _job_events(job: Job):
+    """Server-Sent Events: one event per status change, until the job finishes."""
+    version = -1
+    while True:
+        if job.version != version:
+            version = job.version
+            yield _sse_event(job)
+        if job.finished:
+            return
+        if not await job.wait_change(timeout=15):
+            yield ": keep-alive\n\n"
+
+
+# Endpoints that touch the job queue are `async def` so they run on the
+# event loop thread that owns the asyncio.Queue.
+def _job_response(job: Job, created: bool, stream: bool):
+    if stream:
+        return StreamingResponse(_job_events(job), media_type="text/event-stream")
+
+    body = {**job.as_dict(), "deduplicated": not created, "statusUrl": f"/api/jobs/{job.id}"}
+    return JSONResponse(status_code=202, content=body, headers={"Location": f"/api/jobs/{job.id}"})
+
+
+def _submit(case_id: str, payload: dict) -> tuple[Job, bool]:
+    try:
+        return app.state.jobs.submit(case_id, payload)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "jobId": e.active.id,
+            "statusUrl": f"/api/jobs/{e.active.id}",
+        })
+
+
+@app.post("/api/analysis")
+async def create_analysis(raw: dict = Body(...), model: str | None = None, stream: bool = False):
+    """Run the pipeline on a raw case JSON posted in the body (uses its `id`)."""
+    case_id = _check_case_id(raw.get("id"))
+    job, created = _submit(case_id, {"raw": raw, "model": model or DEFAULT_MODEL})
+    return _job_response(job, created, stream)
+
+
+@app.post("/api/analysis/{case_id}/run")
+async def run_analysis(case_id: str, model: str | None = None, stream: bool = False):
+    """Run the pipeline on data/source/{case_id}_raw.json."""
+    _check_case_id(case_id)
+    if not (SOURCE_DIR / f"{case_id}_raw.json").exists():
+        raise HTTPException(status_code=404, detail=f"No source case found for {case_id}")
+
+    job, created = _submit(case_id, {"raw": None, "model": model or DEFAULT_MODEL})
+    return _job_response(job, created, stream)
+
+
+def _read_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+
+def _write_source(case_id: str, raw: dict):
+    write_json_atomic(SOURCE_DIR / f"{case_id}_raw.json", raw)
+
+
+@app.post("/api/analysis/{case_id}/messages")
+async def post_messages(
+    case_id: str,
+    messages: list = Body(..., embed=True),
+    escalate: bool = Body(False, embed=True),
+    model: str | None = None,
+):
+    """
+    Append new chat messages to data/source/{case_id}_raw.json and
+    re-run only the stages whose inputs changed (see update_case_async).
+    Ordinary messages usually skip every LLM call.
+    """
+    _check_case_id(case_id)
+    raw_path = SOURCE_DIR / f"{case_id}_raw.json"
+    if not raw_path.exists():
+        raise HTTPException(status_code=404, detail=f"No source case found for {case_id}")
+
+    async with _case_lock(case_id):
+        raw = await asyncio.to_thread(_read_json, raw_path)
+        previous = await asyncio.to_thread(_read_json, ANALYSIS_DIR / f"{case_id}_analysis.json")
+
+        analysis, report = await update_case_async(
+            raw, messages, previous,
+            model_name=model or DEFAULT_MODEL,
+            case_id=case_id,
+            stage2_cache=app.state.stage2_cache,
+            escalation=escalate,
+        )
+
+        await asyncio.to_thread(_write_source, case_id, raw)
+        if not report["skipped"]:
+            await asyncio.to_thread(_write_analysis, case_id, analysis)
+
+    app.state.triggers.observe(case_id, messages, arm_past=TRIGGER_CATCH_UP)
+    return {**report, "analysisUrl": f"/api/analysis/{case_id}"}
+
+
+# ========== Summary triggers (wall-clock, see pipeline.trigger_service) ==========
+
+log = get_logger("api")
+
+# case_id → pending summary task (rules firing together → one re-run)
+_trigger_tasks: dict = {}
+
+
+def _seed_triggers(triggers: TriggerService):
+    """Arm deadlines for every source case (timestamps parsed once, here)."""
+    for path in sorted(SOURCE_DIR.glob("*_raw.json")):
+        case_id = path.name[: -len("_raw.json")]
+        if not _CASE_ID.match(case_id):
+            continue
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        triggers.observe(case_id, raw.get("chatLog") or [], arm_past=TRIGGER_CATCH_UP)
+
+
+async def _run_trigger(case_id: str, reason: str):
+    raw_path = SOURCE_DIR / f"{case_id}_raw.json"
+    try:
+        async with _case_lock(case_id):
+            raw = await asyncio.to_thread(_read_json, raw_path)
+            if raw is None:
+                app.state.triggers.close(case_id)
+                return
+            previous = await asyncio.to_thread(_read_json, ANALYSIS_DIR / f"{case_id}_analysis.json")
+
+            analysis, _ = await update_case_async(
+                raw, [], previous,
+                model_name=DEFAULT_MODEL,
+                case_id=case_id,
+                stage2_cache=app.state.stage2_cache,
+                trigger_reason=reason,
+            )
+            await asyncio.to_thread(_write_analysis, case_id, analysis)
+        log.info("summary trigger %s fired for %s", reason, case_id)
+    except Exception:
+        log.exception("summary trigger %s failed for %s", reason, case_id)
+
+
+def _on_trigger(case_id: str, reason: str):
+    if case_id in _trigger_tasks:
+        return
+    task = asyncio.get_running_loop().create_task(_run_trigger(case_id, reason))
+    _trigger_tasks[case_id] = task
+    task.add_done_callback(lambda _: _trigger_tasks.pop(case_id, None))
+
+
+@app.get("/api/triggers/stats")
+def get_trigger_stats():
+    return app.state.triggers.stats()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, stream: bool = False):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+
+    if stream:
+        return StreamingResponse(_job_events(job), media_type="text/event-stream")
+    return job.as_dict()
+
+
+# ========== API：LLM client 連線池狀態 ==========
+
+@app.get("/api/llm/clients")
+def get_llm_clients():
+    return client_stats()
+
+
+@app.get("/api/llm/limits")
+def get_llm_limits():
+    return governor_stats()
+
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return {
+        "analysis": analysis_cache.stats(),
+        "stage2": app.state.stage2_cache.stats(),
+    }
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: span latency histograms + LLM token counters."""
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
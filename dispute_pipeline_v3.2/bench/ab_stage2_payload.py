@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# bench/ab_stage2_payload.py
+# -*- coding: utf-8 -*-
+
+"""
+A/B check for the Stage 2 payload: "full" (original) vs "compact".
+
+Runs Stage 2 twice per case against the same model (no verdict cache)
+and reports label agreement plus estimated payload tokens per mode.
+Exit code 1 if any verdict label differs.
+
+Example:
+    python bench/ab_stage2_payload.py --model gemma3:1b --source-dir data/source
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pipeline.extractor import extract_case  # noqa: E402
+from pipeline.stage2_llm import stage2_llm_evaluate  # noqa: E402
+from pipeline.stage2_payload import build_payload  # noqa: E402
+from pipeline.windowing import window_case, estimate_tokens  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage 2 payload A/B (full vs compact)")
+    parser.add_argument("--model", default="gemma3:1b")
+    parser.add_argument("--source-dir", default=str(ROOT / "data/source"))
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    rows = []
+    for path in sorted(Path(args.source_dir).glob("*_raw.json")):
+        extracted = extract_case(json.loads(path.read_text(encoding="utf-8")))
+        row = {"case": path.name[: -len("_raw.json")]}
+
+        for mode in ("full", "compact"):
+            payload = build_payload(window_case(extracted)[0], mode)
+            verdict = stage2_llm_evaluate(extracted, model_name=args.model, payload_mode=mode)
+            row[mode] = {
+                "payloadTokens": estimate_tokens(json.dumps(payload, ensure_ascii=False)),
+                "label": verdict["snadResult"]["label"],
+            }
+
+        row["same"] = row["full"]["label"] == row["compact"]["label"]
+        rows.append(row)
+
+    full_tokens = sum(r["full"]["payloadTokens"] for r in rows)
+    compact_tokens = sum(r["compact"]["payloadTokens"] for r in rows)
+    results = {
+        "model": args.model,
+        "cases": len(rows),
+        "agreement": round(sum(r["same"] for r in rows) / len(rows), 3) if rows else None,
+        "payloadTokens": {"full": full_tokens, "compact": compact_tokens},
+        "tokenReduction": round(1 - compact_tokens / full_tokens, 3) if full_tokens else None,
+        "mismatches": [r["case"] for r in rows if not r["same"]],
+        "rows": rows,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+    if results["mismatches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# bench/bench_pipeline.py
+# -*- coding: utf-8 -*-
+
+"""
+Stage 1→3 pipeline benchmark with a deterministic fake LLM.
+
+No Ollama / OpenAI needed: both the Stage 2 model and the outcome
+summarizer are served by pipeline.fake_llm, which replays recorded
+`*_stage2_raw.txt` outputs (see `--debug-dump`) with configurable
+latency and jitter.
+
+Two phases:
+1) Stage profile — cases run one by one, each stage timed separately
+   (extract, stage2, postprocess, outcome, stage3, write)
+2) Throughput   — all cases through analyze_case_async with N in flight
+
+Cases = bundled data/source/case*_raw.json, optionally scaled up with
+`--synthetic N` generated cases (longer chats, new IDs).
+
+Output: one JSON document (stdout or --out) to diff between commits.
+
+Example:
+    python bench/bench_pipeline.py --synthetic 2000 --latency-ms 50 --jitter-ms 20 \\
+        --concurrency 32 --out bench_results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pipeline import fake_llm  # noqa: E402
+from pipeline.extractor import extract_case  # noqa: E402
+from pipeline.stage2_llm import stage2_llm_evaluate  # noqa: E402
+from pipeline.postprocess import postprocess_stage2_output  # noqa: E402
+from pipeline.outcome_ai import ai_summarize_outcome  # noqa: E402
+from arbitration_pipeline import analyze_case_async, build_analysis  # noqa: E402
+
+STAGE2_MODEL = "fake:stage2"
+SUMMARY_MODEL = "fake:summary"
+
+STAGES = ["extract", "stage2", "postprocess", "outcome", "stage3", "write"]
+
+
+# -----------------------------
+# Cases
+# -----------------------------
+def load_bundled_cases(source_dir: Path) -> List[dict]:
+    return [
+        json.loads(p.read_text(encoding="utf-8"))
+        for p in sorted(source_dir.glob("case*_raw.json"))
+    ]
+
+
+def make_synthetic_cases(templates: List[dict], n: int, seed: int) -> List[dict]:
+    """
+    Clone bundled cases with new IDs and chat logs stretched to
+    1–8× their length, so prompt size varies like real traffic.
+    """
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        case = copy.deepcopy(templates[i % len(templates)])
+        case["id"] = f"synthetic{i:06d}"
+        chat = case.get("chatLog") or []
+        if chat:
+            case["chatLog"] = chat * rng.randint(1, 8)
+        out.append(case)
+    return out
+
+
+# -----------------------------
+# Measurements
+# -----------------------------
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, round(q * (len(s) - 1))))
+    return s[k]
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "meanMs": round(statistics.fmean(values) * 1000, 3) if values else 0.0,
+        "p50Ms": round(_percentile(values, 0.50) * 1000, 3),
+        "p95Ms": round(_percentile(values, 0.95) * 1000, 3),
+        "maxMs": round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+# -----------------------------
+# Phase 1 — per-stage latency
+# -----------------------------
+def profile_stages(cases: List[dict], out_dir: Path) -> Dict[str, Dict[str, float]]:
+    timings: Dict[str, List[float]] = {s: [] for s in STAGES}
+
+    for raw in cases:
+        t = time.perf_counter()
+        extracted = extract_case(raw)
+        timings["extract"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        stage2_raw = stage2_llm_evaluate(extracted, model_name=STAGE2_MODEL)
+        timings["stage2"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        stage2 = postprocess_stage2_output(stage2_raw)
+        timings["postprocess"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        outcome = ai_summarize_outcome(extracted.get("timeline") or [], SUMMARY_MODEL)
+        timings["outcome"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        analysis = build_analysis(extracted, stage2, STAGE2_MODEL, outcome=outcome)
+        timings["stage3"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        out_path = out_dir / f"{raw.get('id')}_analysis.json"
+        out_path.write_text(json.dumps(analysis, indent=2, ensure_ascii=False), encoding="utf-8")
+        timings["write"].append(time.perf_counter() - t)
+
+    return {stage: _summarize(v) for stage, v in timings.items()}
+
+
+# -----------------------------
+# Phase 2 — throughput
+# -----------------------------
+async def measure_throughput(cases: List[dict], concurrency: int) -> Dict[str, float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=2 * concurrency))
+
+    async def one(raw: dict):
+        async with sem:
+            t = time.perf_counter()
+            await analyze_case_async(raw, model_name=STAGE2_MODEL, summary_model=SUMMARY_MODEL)
+            latencies.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(raw) for raw in cases))
+    wall = time.perf_counter() - t0
+
+    return {
+        "cases": len(cases),
+        "concurrency": concurrency,
+        "wallSec": round(wall, 3),
+        "casesPerSec": round(len(cases) / wall, 2) if wall else 0.0,
+        "caseLatency": _summarize(latencies),
+    }
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Stage 1→3 pipeline benchmark (fake LLM)")
+    parser.add_argument("--source-dir", default=str(ROOT / "data/source"))
+    parser.add_argument("--replay-dir", default=str(ROOT / "data/analysis"),
+                        help="Directory with recorded *_stage2_raw.txt outputs")
+    parser.add_argument("--synthetic", type=int, default=0, help="Extra generated cases")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fake LLM latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="± uniform jitter per call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    fake_llm.configure(
+        replay_dir=Path(args.replay_dir),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    )
+
+    bundled = load_bundled_cases(Path(args.source_dir))
+    if not bundled:
+        raise SystemExit(f"No case*_raw.json found in {args.source_dir}")
+    cases = bundled + make_synthetic_cases(bundled, args.synthetic, args.seed)
+
+    # Pipeline logging is left unconfigured → only warnings reach stderr
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = profile_stages(cases, Path(tmp))
+        throughput = asyncio.run(measure_throughput(cases, args.concurrency))
+
+    results = {
+        "benchmark": "pipeline_stage1_3",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "bundledCases": len(bundled),
+            "syntheticCases": args.synthetic,
+            "latencyMs": args.latency_ms,
+            "jitterMs": args.jitter_ms,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "replayRecordings": len(fake_llm.load_recordings(Path(args.replay_dir))),
+        },
+        "stages": stages,
+        "throughput": throughput,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
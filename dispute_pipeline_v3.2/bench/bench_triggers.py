@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# bench/bench_triggers.py
+# -*- coding: utf-8 -*-
+
+"""
+Summary-trigger sweep: check_summary_trigger per case vs
+pipeline.trigger_batch.check_summary_triggers_batch.
+
+Cases = bundled data/source/*_raw.json chats plus `--synthetic N`
+random chats. Both paths must return the same {case_id: reason};
+exit code 1 otherwise.
+
+Example:
+    python bench/bench_triggers.py --synthetic 100000 --messages 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pipeline.summary_trigger import _parse_time, check_summary_trigger  # noqa: E402
+from pipeline.trigger_batch import chat_columns, check_summary_triggers_batch  # noqa: E402
+
+
+def _synthetic_chats(n: int, messages: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    chats = {}
+    for i in range(n):
+        t = start + timedelta(minutes=rnd.randrange(500_000))
+        log = []
+        for _ in range(rnd.randint(1, messages)):
+            # mostly minutes apart, sometimes a day+ of silence
+            t += timedelta(minutes=rnd.choice([1, 5, 30, 120, 1500, 2000]))
+            log.append({
+                "timestamp": t.strftime("%Y-%m-%d %H:%M"),
+                "sender": rnd.choice(["Buyer", "Seller", "Buyer", "Seller", "System"]),
+                "text": "...",
+            })
+        chats[f"syn{i:07d}"] = log
+    return chats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary trigger sweep benchmark")
+    parser.add_argument("--source-dir", default=str(ROOT / "data/source"))
+    parser.add_argument("--synthetic", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=30, help="Max messages per synthetic chat")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chats = {
+        p.name[: -len("_raw.json")]: json.loads(p.read_text(encoding="utf-8")).get("chatLog") or []
+        for p in sorted(Path(args.source_dir).glob("*_raw.json"))
+    }
+    chats.update(_synthetic_chats(args.synthetic, args.messages, args.seed))
+    rows = sum(len(c) for c in chats.values())
+
+    _parse_time.cache_clear()
+    t0 = time.perf_counter()
+    loop = {}
+    for case_id, log in chats.items():
+        r = check_summary_trigger(log)
+        if r["trigger"]:
+            loop[case_id] = r["reason"]
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    columns = chat_columns(chats)
+    columns_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = check_summary_triggers_batch(*columns)
+    batch_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "cases": len(chats),
+        "messages": rows,
+        "triggered": len(batch),
+        "loopSeconds": round(loop_s, 3),
+        "batchSeconds": round(batch_s, 3),
+        "columnsSeconds": round(columns_s, 3),
+        "speedup": round(loop_s / batch_s, 1) if batch_s else None,
+        "same": loop == batch,
+    }, indent=2))
+
+    if loop != batch:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
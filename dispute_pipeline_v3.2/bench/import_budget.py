@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# bench/import_budget.py
+# -*- coding: utf-8 -*-
+
+"""
+Import-time budget check (`python -X importtime`).
+
+Each target is imported in a fresh interpreter; the cumulative import
+time of the target module (best of --repeat runs) must stay under its
+budget, and none of the provider SDKs may be loaded — they belong to
+the first LLM call, not to start-up (see pipeline/llm_clients.py).
+python-dotenv is only forbidden when no .env file is found (the same
+lookup as pipeline.env.load_env), since loading one is its job.
+
+Exit code 1 on any violation, so this can run in CI.
+
+Example:
+    python bench/import_budget.py
+    python bench/import_budget.py --budget-ms arbitration_pipeline=80 --out import_times.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# module → budget in ms (cumulative, as reported by -X importtime)
+DEFAULT_BUDGETS_MS = {
+    "pipeline.summary_trigger": 30,
+    "arbitration_pipeline": 150,
+    "app.main": 600,   # FastAPI itself is most of this
+}
+
+# Must not be imported just by importing a target
+FORBIDDEN = ("openai", "langchain_ollama", "langchain_core", "ollama", "httpx", "dotenv", "numpy")
+
+# Allowed when a .env exists (pipeline.env imports it only then)
+NEEDED_FOR_ENV_FILE = ("dotenv",)
+
+
+def _measure(module: str) -> dict:
+    code = (
+        "import sys, json\n"
+        f"sys.path[:0] = [{str(ROOT / 'src')!r}, {str(ROOT)!r}]\n"
+        f"import {module}\n"
+        "from pipeline.env import find_env_file\n"
+        f"allowed = {NEEDED_FOR_ENV_FILE!r} if find_env_file() else ()\n"
+        f"print(json.dumps(sorted(m for m in {FORBIDDEN!r} if m in sys.modules and m not in allowed)))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    )
+
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative_us = int(parts[1])
+
+    return {"ms": round((cumulative_us or 0) / 1000, 1), "loaded": json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--budget-ms", action="append", default=[], metavar="MODULE=MS",
+                        help="Override / add a budget (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; best one counts")
+    parser.add_argument("--out", help="Write results JSON here")
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for item in args.budget_ms:
+        module, _, ms = item.partition("=")
+        budgets[module] = float(ms)
+
+    results, failed = {}, False
+    for module, budget in budgets.items():
+        runs = [_measure(module) for _ in range(max(1, args.repeat))]
+        best = min(runs, key=lambda r: r["ms"])
+        ok = best["ms"] <= budget and not best["loaded"]
+        failed |= not ok
+        results[module] = {"ms": best["ms"], "budgetMs": budget, "forbiddenLoaded": best["loaded"], "ok": ok}
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
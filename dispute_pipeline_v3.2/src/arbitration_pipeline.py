@@ -8,13 +8,17 @@ C2C Dispute Arbitration Pipeline (v3 Modular)
 
 from __future__ import annotations
 import argparse
+import asyncio
 import json
+import os
+import threading
 from pathlib import Path
 
 # === Import modules ===
-from pipeline.extractor import extract_case, gen_eligibility_notes
+from pipeline.extractor import append_messages, extract_case, gen_eligibility_notes
 from pipeline.rflags import evaluate_r_flags
-from pipeline.stage2_llm import stage2_llm_evaluate
+from pipeline.stage2_llm import stage2_llm_evaluate, json_repair_stats, STAGE2_PROMPT_VERSION
+from pipeline.stage2_cache import Stage2Cache
 from pipeline.postprocess import postprocess_stage2_output
 from pipeline.policy import (
     compute_eligibility_policy_anchors,
@@ -22,13 +26,46 @@ from pipeline.policy import (
     compute_recommendation_policy_anchors,
     RECOMMENDATION_TEMPLATES,  
 )
-from pipeline.summary import build_case_summary
-from pipeline.outcome_ai import ai_summarize_outcome
+from pipeline.summary import build_case_summary, extract_outcome, OUTCOME_NOT_COMPUTED
+from pipeline.summary_trigger import check_summary_trigger
+from pipeline.outcome_ai import ai_summarize_outcome, OUTCOME_MODES
+from pipeline.stage2_payload import PAYLOAD_MODES
+from pipeline.batch import resolve_batch, run_batch, default_manifest_path
+from pipeline import tracing
+from pipeline.logs import configure_logging
+from pipeline.tracing import span, trace_case
+from pipeline.env import load_env
+from pipeline.residency import should_group
+from pipeline.config import get_config, set_config
+
+# Provider SDKs (openai / langchain_ollama) are imported by
+# pipeline.llm_clients on first use — not here.
+load_env()
+
+
+def _summary_model(summary_model: str | None = None) -> str:
+    # Stage 3 outcome summary: config stage3_model (default local gemma3:1b)
+    return summary_model or get_config().stage3_model
+
+
+def write_json_atomic(path: Path, obj) -> None:
+    """
+    Write JSON via a temp file in the same directory + os.replace, so a
+    reader (the API, a concurrent run) never sees a half-written file.
+    """
+    # pid + thread id: concurrent writers of the same case never share a temp file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-load_dotenv()
 # ======================================================
 # Stage 3 — Recommendation Builder
 # ======================================================
@@ -83,7 +120,13 @@ def _build_recommendation(label: str, stage2_rec: dict | None) -> dict:
 # ======================================================
 # Stage 3 — Build Final Output
 # ======================================================
-def build_analysis(extracted: dict, stage2: dict, model_name: str) -> dict:
+def build_analysis(
+    extracted: dict,
+    stage2: dict,
+    model_name: str,
+    outcome=OUTCOME_NOT_COMPUTED,
+    summary_model: str | None = None,
+) -> dict:
 
     # -------- 1) Eligibility notes ----------
     notes = gen_eligibility_notes(
@@ -127,7 +170,8 @@ def build_analysis(extracted: dict, stage2: dict, model_name: str) -> dict:
         extracted,
         stage2,
         notes,
-        "gemma3:1b",   # ← Stage 3 永遠使用本地模型
+        _summary_model(summary_model),   # ← Stage 3 model from config (stage3_model)
+        outcome=outcome,
     )
 
     return {
@@ -141,7 +185,71 @@ def build_analysis(extracted: dict, stage2: dict, model_name: str) -> dict:
 # ======================================================
 # Runner
 # ======================================================
-def run(case_id: str, data_dir: Path, out_dir: Path, model_name: str, debug_dump: bool):
+async def analyze_case_async(
+    raw: dict,
+    model_name: str,
+    case_id: str | None = None,
+    debug_dump_dir: Path | None = None,
+    stage2_cache: Stage2Cache | None = None,
+    summary_model: str | None = None,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+) -> dict:
+    """
+    Stage 1 → 3 for one raw case, without touching the filesystem.
+
+    Stage 2 (classification) and the outcome summary are two independent
+    LLM round-trips: the summary only needs the Stage 1 timeline. Both are
+    started together in worker threads and joined before Stage 3, so the
+    case takes roughly as long as the slower of the two calls.
+    """
+    summary_model = _summary_model(summary_model)
+
+    with trace_case(case_id or raw.get("id")):
+        # Stage 1
+        with span("extract"):
+            extracted = extract_case(raw)
+
+        # Stage 2 ‖ outcome summary
+        stage2_raw, outcome = await asyncio.gather(
+            asyncio.to_thread(
+                stage2_llm_evaluate,
+                extracted,
+                model_name=model_name,
+                debug_dump_dir=debug_dump_dir,
+                case_id=case_id,
+                cache=stage2_cache,
+                constrained=constrained,
+                payload_mode=payload_mode,
+            ),
+            asyncio.to_thread(
+                ai_summarize_outcome,
+                extracted.get("timeline") or [],
+                summary_model,
+                outcome_mode,
+            ),
+        )
+
+        with span("stage2_postprocess"):
+            stage2 = postprocess_stage2_output(stage2_raw)
+
+        # Stage 3
+        with span("policy_anchors"):
+            return build_analysis(extracted, stage2, model_name, outcome=outcome, summary_model=summary_model)
+
+
+async def run_async(
+    case_id: str,
+    data_dir: Path,
+    out_dir: Path,
+    model_name: str,
+    debug_dump: bool,
+    stage2_cache: Stage2Cache | None = None,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+) -> Path:
 
     raw_path = data_dir / f"{case_id}_raw.json"
     out_dir.mkdir(exist_ok=True, parents=True)
@@ -151,27 +259,312 @@ def run(case_id: str, data_dir: Path, out_dir: Path, model_name: str, debug_dump
 
     raw = json.loads(raw_path.read_text(encoding="utf-8"))
 
-    # Stage 1
-    extracted = extract_case(raw)
+    with trace_case(case_id):
+        analysis = await analyze_case_async(
+            raw,
+            model_name=model_name,
+            case_id=case_id,
+            debug_dump_dir=out_dir if debug_dump else None,
+            stage2_cache=stage2_cache,
+            constrained=constrained,
+            payload_mode=payload_mode,
+            outcome_mode=outcome_mode,
+        )
+
+        # Save
+        with span("file_write"):
+            out_path = out_dir / f"{case_id}_analysis.json"
+            write_json_atomic(out_path, analysis)
 
-    # Stage 2
-    stage2_raw = stage2_llm_evaluate(
-        extracted,
-        model_name=model_name,
-        debug_dump_dir=out_dir if debug_dump else None,
-        case_id=case_id,
+    return out_path
+
+
+def run(
+    case_id: str,
+    data_dir: Path,
+    out_dir: Path,
+    model_name: str,
+    debug_dump: bool,
+    stage2_cache: Stage2Cache | None = None,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+) -> Path:
+    """Synchronous wrapper around run_async (single-case CLI / scripts)."""
+    return asyncio.run(
+        run_async(
+            case_id, data_dir, out_dir, model_name, debug_dump,
+            stage2_cache, constrained, payload_mode, outcome_mode,
+        )
     )
 
-    stage2 = postprocess_stage2_output(stage2_raw)
 
-    # Stage 3
-    analysis = build_analysis(extracted, stage2, model_name)
+# ======================================================
+# Batch grouped by model (local models stay resident)
+# ======================================================
+# Cases per group: bounds memory (raw / extracted / Stage 2 results are
+# held until the group's summaries run); each model loads once per group
+GROUP_WINDOW = int(os.getenv("BATCH_GROUP_WINDOW", "64"))
+
+
+def grouped_batch_runner(
+    n_cases: int,
+    workers: int,
+    window: int,
+    out_dir: Path,
+    model_name: str,
+    debug_dump: bool,
+    stage2_cache: Stage2Cache | None = None,
+    summary_model: str | None = None,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+):
+    """
+    Batch runner for run_batch(..., max_cases=window) that keeps ONE
+    model busy at a time. Cases are taken in groups of `window` (in the
+    order run_batch admits them): every case of a group runs Stage 1 +
+    Stage 2 first, the group's outcome summaries start after its last
+    Stage 2 call, and the next group starts once this one is written.
+    With two local Ollama models this loads each once per group instead
+    of swapping them on every case, while only `window` cases are held
+    in memory. At most `workers` LLM calls in flight.
+    """
+    summary_model = _summary_model(summary_model)
+    slots = asyncio.Semaphore(max(1, workers))
+    window = max(1, window)
+    groups: dict = {}
+    admitted = [0]
+
+    def _group(k: int) -> dict:
+        g = groups.get(k)
+        if g is None:
+            size = min(window, n_cases - k * window)
+            g = groups[k] = {
+                "stage2Left": size,
+                "left": size,
+                "stage2Done": asyncio.Event(),
+                "done": asyncio.Event(),
+            }
+        return g
+
+    async def runner(case_id: str, data_dir: Path) -> Path:
+        k = admitted[0] // window
+        admitted[0] += 1
+        group = _group(k)
+        if k > 0:
+            await _group(k - 1)["done"].wait()   # previous group fully written
+
+        try:
+            with trace_case(case_id):
+                try:
+                    raw_path = data_dir / f"{case_id}_raw.json"
+                    if not raw_path.exists():
+                        raise FileNotFoundError(f"Case file not found: {raw_path}")
+                    raw = json.loads(raw_path.read_text(encoding="utf-8"))
+
+                    with span("extract"):
+                        extracted = extract_case(raw)
+
+                    async with slots:
+                        stage2_raw = await asyncio.to_thread(
+                            stage2_llm_evaluate,
+                            extracted,
+                            model_name=model_name,
+                            debug_dump_dir=out_dir if debug_dump else None,
+                            case_id=case_id,
+                            cache=stage2_cache,
+                            constrained=constrained,
+                            payload_mode=payload_mode,
+                        )
+                finally:
+                    group["stage2Left"] -= 1
+                    if group["stage2Left"] <= 0:
+                        group["stage2Done"].set()
+
+                await group["stage2Done"].wait()
+                async with slots:
+                    outcome = await asyncio.to_thread(
+                        ai_summarize_outcome, extracted.get("timeline") or [], summary_model, outcome_mode,
+                    )
+
+                with span("stage2_postprocess"):
+                    stage2 = postprocess_stage2_output(stage2_raw)
+                with span("policy_anchors"):
+                    analysis = build_analysis(extracted, stage2, model_name, outcome=outcome, summary_model=summary_model)
+
+                out_dir.mkdir(exist_ok=True, parents=True)
+                with span("file_write"):
+                    out_path = out_dir / f"{case_id}_analysis.json"
+                    write_json_atomic(out_path, analysis)
+            return out_path
+        finally:
+            group["left"] -= 1
+            if group["left"] <= 0:
+                group["done"].set()
+                groups.pop(k - 1, None)
+
+    return runner
+
 
-    # Save
+# ======================================================
+# Incremental re-analysis (new chat messages)
+# ======================================================
+def _summary_trigger(chat_log: list, escalation: bool = False) -> dict:
+    msgs = [m for m in chat_log if isinstance(m, dict) and m.get("timestamp")]
+    try:
+        return check_summary_trigger(msgs, escalation_flag=escalation)
+    except ValueError:   # unparseable timestamp → treat as "no trigger"
+        return {"trigger": False, "reason": None}
+
+
+async def update_case_async(
+    raw: dict,
+    new_messages: list,
+    previous: dict | None,
+    model_name: str,
+    case_id: str | None = None,
+    stage2_cache: Stage2Cache | None = None,
+    summary_model: str | None = None,
+    escalation: bool = False,
+    extracted: dict | None = None,
+    trigger_reason: str | None = None,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+) -> tuple[dict, dict]:
+    """
+    Re-analyze a case after new chat messages were posted.
+
+    `raw["chatLog"]` and `extracted` (if given, else extracted from `raw`)
+    are updated IN PLACE. `previous` is the last analysis for the case.
+
+    What re-runs:
+    - Stage 2         → only if a new message is highlighted
+    - outcome summary → only if check_summary_trigger starts firing (or
+                        changes reason) with the new messages, or on
+                        escalation, or when `trigger_reason` is given
+                        (a wall-clock deadline from pipeline.trigger_service)
+    - Stage 3         → whenever one of the above ran (cheap, no LLM)
+    Nothing runs, and `previous` is returned as is, otherwise.
+    Without a previous analysis this is a full analyze_case_async.
+    `constrained` / `payload_mode` / `outcome_mode` are forwarded to the
+    re-run stages as in analyze_case_async.
+
+    Returns (analysis, report).
+    """
+    case_id = case_id or raw.get("id")
+    summary_model = _summary_model(summary_model)
+    new_messages = [m for m in new_messages or [] if isinstance(m, dict)]
+    chat_log = raw.setdefault("chatLog", [])
+
+    with trace_case(case_id):
+        trigger_before = _summary_trigger(chat_log)
+
+        if extracted is None:
+            with span("extract"):
+                extracted = extract_case(raw)
+        chat_log.extend(new_messages)
+        append_messages(extracted, new_messages)
+
+        if trigger_reason:
+            trigger = {"trigger": True, "reason": trigger_reason}
+        else:
+            trigger = _summary_trigger(chat_log, escalation)
+        highlighted = sum(1 for m in new_messages if m.get("highlight") is True)
+
+        rerun_stage2 = previous is None or highlighted > 0
+        rerun_outcome = previous is None or bool(trigger_reason) or (
+            trigger["trigger"] and trigger != trigger_before
+        )
+
+        report = {
+            "caseId": case_id,
+            "newMessages": len(new_messages),
+            "highlighted": highlighted,
+            "trigger": trigger,
+            "rerun": [
+                stage for stage, flag in (
+                    ("stage2", rerun_stage2), ("outcome", rerun_outcome),
+                    ("stage3", rerun_stage2 or rerun_outcome),
+                ) if flag
+            ],
+            "skipped": not (rerun_stage2 or rerun_outcome),
+        }
+        if report["skipped"]:
+            return previous, report
+
+        # Re-use whatever did not change from the previous analysis
+        if rerun_stage2:
+            stage2_call = asyncio.to_thread(
+                stage2_llm_evaluate, extracted,
+                model_name=model_name, case_id=case_id, cache=stage2_cache,
+                constrained=constrained, payload_mode=payload_mode,
+            )
+        else:
+            prev_snad = previous.get("snadResult") or {}
+            stage2_call = asyncio.sleep(0, {"snadResult": {
+                "label": prev_snad.get("label", "Neutral"),
+                "reason": prev_snad.get("reason", ""),
+            }})
+
+        if rerun_outcome:
+            outcome_call = asyncio.to_thread(
+                ai_summarize_outcome, extracted.get("timeline") or [], summary_model, outcome_mode,
+            )
+        else:
+            outcome_call = asyncio.sleep(0, extract_outcome(previous.get("caseSummary")))
+
+        stage2_raw, outcome = await asyncio.gather(stage2_call, outcome_call)
+
+        with span("stage2_postprocess"):
+            stage2 = postprocess_stage2_output(stage2_raw)
+
+        with span("policy_anchors"):
+            return build_analysis(
+                extracted, stage2, model_name, outcome=outcome, summary_model=summary_model,
+            ), report
+
+
+async def update_async(
+    case_id: str,
+    data_dir: Path,
+    out_dir: Path,
+    new_messages: list,
+    model_name: str,
+    stage2_cache: Stage2Cache | None = None,
+    escalation: bool = False,
+    constrained: bool | None = None,
+    payload_mode: str | None = None,
+    outcome_mode: str | None = None,
+) -> dict:
+    """
+    File-based update_case_async: appends the messages to
+    {case_id}_raw.json and rewrites {case_id}_analysis.json only if
+    something was re-run. Returns the report.
+    """
+    raw_path = data_dir / f"{case_id}_raw.json"
     out_path = out_dir / f"{case_id}_analysis.json"
-    out_path.write_text(json.dumps(analysis, indent=2, ensure_ascii=False), encoding="utf-8")
+    if not raw_path.exists():
+        raise FileNotFoundError(f"Case file not found: {raw_path}")
 
-    return out_path
+    raw = json.loads(raw_path.read_text(encoding="utf-8"))
+    previous = json.loads(out_path.read_text(encoding="utf-8")) if out_path.exists() else None
+
+    analysis, report = await update_case_async(
+        raw, new_messages, previous,
+        model_name=model_name, case_id=case_id,
+        stage2_cache=stage2_cache, escalation=escalation,
+        constrained=constrained, payload_mode=payload_mode, outcome_mode=outcome_mode,
+    )
+
+    write_json_atomic(raw_path, raw)
+    if not report["skipped"]:
+        out_dir.mkdir(exist_ok=True, parents=True)
+        with span("file_write"):
+            write_json_atomic(out_path, analysis)
+
+    return report
 
 
 def main():
@@ -179,16 +572,176 @@ def main():
     parser.add_argument("--case-id", default="case1")
     parser.add_argument("--data-dir", default="./data/source")
     parser.add_argument("--out-dir", default="./data/analysis")
-    parser.add_argument("--model", default="gemma3:1b")
+    parser.add_argument("--model", help="Stage 2 model (default: stage2_model from --config, else gemma3:1b)")
+    parser.add_argument(
+        "--config",
+        help="Runtime config JSON with per-stage models, e.g. config_cloud.json (env PIPELINE_CONFIG)",
+    )
     parser.add_argument("--debug-dump", action="store_true")
+    parser.add_argument(
+        "--batch",
+        help="Run many cases: a directory, a glob of *_raw.json files, or a .jsonl manifest of case IDs",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent cases in --batch mode")
+    parser.add_argument(
+        "--group-by-model", action=argparse.BooleanOptionalAction, default=None,
+        help="--batch: run all Stage 2 calls, then all outcome summaries, so each local model is loaded once "
+             "(default: on when Stage 2 and the summary use two different Ollama models)",
+    )
+    parser.add_argument(
+        "--group-window", type=int, default=GROUP_WINDOW,
+        help="--group-by-model: cases per group, i.e. held in memory at once (env BATCH_GROUP_WINDOW, default 64)",
+    )
+    parser.add_argument("--manifest", help="Where to write the --batch results manifest")
+    parser.add_argument("--cache-db", default="./data/cache/stage2_cache.sqlite", help="Stage 2 verdict cache (SQLite)")
+    parser.add_argument("--cache-ttl-hours", type=float, default=0, help="Expire cached verdicts after N hours (0 = never)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the Stage 2 model")
+    parser.add_argument(
+        "--constrained", action="store_true", default=None,
+        help="Request schema-constrained Stage 2 output (Ollama format / OpenAI json_schema)",
+    )
+    parser.add_argument(
+        "--payload", choices=PAYLOAD_MODES,
+        help="Stage 2 payload: full (original, default; env STAGE2_PAYLOAD) or compact (each fact once)",
+    )
+    parser.add_argument(
+        "--outcome-mode", choices=OUTCOME_MODES,
+        help="Outcome summary: tail (last messages, default, env OUTCOME_MODE) or mapreduce (whole chat)",
+    )
+    parser.add_argument(
+        "--append-messages",
+        help="JSON file with new chatLog messages for --case-id: append them and re-run only what changed",
+    )
+    parser.add_argument("--escalate", action="store_true", help="With --append-messages: manual escalation")
+    parser.add_argument("--trace-file", help="Write per-stage timing / token traces as JSON")
+    parser.add_argument("--log-level", help="DEBUG / INFO / WARNING (env PIPELINE_LOG_LEVEL, default INFO)")
+    parser.add_argument(
+        "--log-sample", type=float,
+        help="Fraction of cases whose raw LLM output is logged at DEBUG (env PIPELINE_LOG_SAMPLE, default 0.1)",
+    )
+    parser.add_argument("--log-rate", type=float, help="Max log records per second, 0 = unlimited (env PIPELINE_LOG_RATE)")
     args = parser.parse_args()
 
+    configure_logging(level=args.log_level, sample=args.log_sample, rate_per_sec=args.log_rate)
+
+    if args.config:
+        set_config(args.config)
+    args.model = args.model or get_config().stage2_model
+
+    if args.trace_file:
+        tracing.collect_traces(True)
+
+    data_dir = Path(args.data_dir)
+    out_dir = Path(args.out_dir)
+
+    stage2_cache = None
+    if not args.no_cache:
+        stage2_cache = Stage2Cache(
+            Path(args.cache_db),
+            prompt_version=STAGE2_PROMPT_VERSION,
+            ttl_seconds=args.cache_ttl_hours * 3600,
+        )
+
+    try:
+        _dispatch(args, data_dir, out_dir, stage2_cache)
+    finally:
+        if stage2_cache is not None:
+            print(f"[stage2-cache] {stage2_cache.stats()}")
+            stage2_cache.close()
+        print(f"[stage2-json] {json_repair_stats()}")
+        if args.trace_file:
+            _write_trace_file(Path(args.trace_file))
+
+
+def _write_trace_file(path: Path):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    doc = {"traces": tracing.finished_traces(), "summary": tracing.summary()}
+    path.write_text(json.dumps(doc, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[trace] {len(doc['traces'])} case trace(s) → {path}")
+
+
+def _dispatch(args, data_dir: Path, out_dir: Path, stage2_cache: Stage2Cache | None):
+    if args.append_messages:
+        messages = json.loads(Path(args.append_messages).read_text(encoding="utf-8"))
+        if isinstance(messages, dict):
+            messages = [messages]
+        report = asyncio.run(update_async(
+            case_id=args.case_id,
+            data_dir=data_dir,
+            out_dir=out_dir,
+            new_messages=messages,
+            model_name=args.model,
+            stage2_cache=stage2_cache,
+            escalation=args.escalate,
+            constrained=args.constrained,
+            payload_mode=args.payload,
+            outcome_mode=args.outcome_mode,
+        ))
+        print(f"[update] {json.dumps(report, ensure_ascii=False)}")
+        return
+
+    if args.batch:
+        try:
+            items = resolve_batch(args.batch, data_dir)
+        except ValueError as e:
+            raise SystemExit(f"--batch {args.batch!r}: {e}")
+        if not items:
+            raise SystemExit(f"No cases matched --batch {args.batch!r}")
+
+        manifest_path = Path(args.manifest) if args.manifest else default_manifest_path(out_dir)
+        group = args.group_by_model
+        if group is None:
+            group = should_group(args.model, _summary_model())
+
+        args.group_window = max(args.workers, args.group_window)
+        if group:
+            print(f"[batch] grouped by model: {args.model} (Stage 2) → {_summary_model()} (outcome), {args.group_window} cases per group")
+            runner = grouped_batch_runner(
+                len(items), args.workers, args.group_window, out_dir, args.model, args.debug_dump,
+                stage2_cache=stage2_cache,
+                constrained=args.constrained,
+                payload_mode=args.payload,
+                outcome_mode=args.outcome_mode,
+            )
+        else:
+            def runner(case_id, case_dir):
+                return run_async(
+                    case_id=case_id,
+                    data_dir=case_dir,
+                    out_dir=out_dir,
+                    model_name=args.model,
+                    debug_dump=args.debug_dump,
+                    stage2_cache=stage2_cache,
+                    constrained=args.constrained,
+                    payload_mode=args.payload,
+                    outcome_mode=args.outcome_mode,
+                )
+
+        result = asyncio.run(run_batch(
+            items,
+            runner=runner,
+            workers=args.workers,
+            manifest_path=manifest_path,
+            max_cases=args.group_window if group else None,
+        ))
+        print(
+            f"[batch] {result['succeeded']}/{result['total']} succeeded "
+            f"in {result['wallSec']}s → {manifest_path}"
+        )
+        if result["failed"]:
+            raise SystemExit(1)
+        return
+
     run(
         case_id=args.case_id,
-        data_dir=Path(args.data_dir),
-        out_dir=Path(args.out_dir),
+        data_dir=data_dir,
+        out_dir=out_dir,
         model_name=args.model,
         debug_dump=args.debug_dump,
+        stage2_cache=stage2_cache,
+        constrained=args.constrained,
+        payload_mode=args.payload,
+        outcome_mode=args.outcome_mode,
     )
 
 
@@ -0,0 +1,201 @@
+# src/pipeline/batch.py
+"""
+Batch runner — push many cases through Stage 1→3 in ONE process.
+
+Responsibilities:
+-----------------
+- Resolve a batch spec into (case_id, data_dir) pairs:
+    * a directory            → every `*_raw.json` inside it
+    * a glob pattern         → every matching `*_raw.json` file
+    * a JSONL manifest       → one case per line (`{"caseId": "case1"}` or `"case1"`)
+  Outputs are named by case_id, so the same case_id from two different
+  directories is rejected up front instead of silently overwriting.
+- Run cases concurrently (at most `workers` in flight) so the I/O-bound
+  LLM calls (Stage 2 + outcome summary) of different cases overlap.
+- Never stop on a single failing case — record the error and continue.
+- Write a per-run results manifest (JSON) next to the analysis outputs.
+
+The actual per-case work is injected as an async
+`runner(case_id, data_dir) -> Path`, so this module does not import the
+pipeline stages itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import glob
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+RAW_SUFFIX = "_raw.json"
+
+BatchItem = Tuple[str, Path]
+
+
+# -----------------------------
+# Resolve batch spec → cases
+# -----------------------------
+def _case_id_from_file(path: Path) -> Optional[str]:
+    if not path.name.endswith(RAW_SUFFIX):
+        return None
+    return path.name[: -len(RAW_SUFFIX)]
+
+
+def _items_from_files(paths) -> List[BatchItem]:
+    items: List[BatchItem] = []
+    for p in sorted(Path(x) for x in paths):
+        case_id = _case_id_from_file(p)
+        if case_id and p.is_file():
+            items.append((case_id, p.parent))
+    return items
+
+
+def _items_from_manifest(path: Path, data_dir: Path) -> List[BatchItem]:
+    items: List[BatchItem] = []
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        entry = json.loads(line)
+        if isinstance(entry, str):
+            items.append((entry, data_dir))
+        elif isinstance(entry, dict):
+            case_id = entry.get("caseId") or entry.get("case_id") or entry.get("id")
+            if not case_id:
+                raise ValueError(f"{path}:{lineno}: manifest entry has no caseId")
+            entry_dir = entry.get("dataDir")
+            items.append((str(case_id), Path(entry_dir) if entry_dir else data_dir))
+        else:
+            raise ValueError(f"{path}:{lineno}: unsupported manifest entry {entry!r}")
+    return items
+
+
+def resolve_batch(spec: str, data_dir: Path) -> List[BatchItem]:
+    """
+    Turn `--batch` input into a de-duplicated, ordered list of (case_id, data_dir).
+    Raises ValueError if one case_id comes from more than one directory.
+    """
+    path = Path(spec)
+
+    if path.is_dir():
+        items = _items_from_files(path.glob(f"*{RAW_SUFFIX}"))
+    elif path.is_file() and path.suffix == ".jsonl":
+        items = _items_from_manifest(path, data_dir)
+    else:
+        items = _items_from_files(glob.glob(spec))
+
+    seen = set()
+    unique: List[BatchItem] = []
+    for case_id, case_dir in items:
+        key = (case_id, str(case_dir))
+        if key not in seen:
+            seen.add(key)
+            unique.append((case_id, case_dir))
+
+    dirs: Dict[str, List[str]] = {}
+    for case_id, case_dir in unique:
+        dirs.setdefault(case_id, []).append(str(case_dir))
+    clashes = {case_id: d for case_id, d in dirs.items() if len(d) > 1}
+    if clashes:
+        detail = "; ".join(f"{case_id}: {', '.join(d)}" for case_id, d in clashes.items())
+        raise ValueError(
+            f"Same case id in several directories (their outputs would overwrite each other): {detail}"
+        )
+    return unique
+
+
+# -----------------------------
+# Run a batch
+# -----------------------------
+Runner = Callable[[str, Path], Awaitable[Path]]
+
+
+async def _run_one(runner: Runner, sem: asyncio.Semaphore, case_id: str, case_dir: Path) -> Dict[str, Any]:
+    async with sem:
+        started = time.perf_counter()
+        try:
+            out_path = await runner(case_id, case_dir)
+            res = {
+                "caseId": case_id,
+                "status": "ok",
+                "output": str(out_path),
+                "error": None,
+                "elapsedSec": round(time.perf_counter() - started, 3),
+            }
+        except Exception as e:
+            res = {
+                "caseId": case_id,
+                "status": "error",
+                "output": None,
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(),
+                "elapsedSec": round(time.perf_counter() - started, 3),
+            }
+
+    mark = "✅" if res["status"] == "ok" else "❌"
+    print(f"[batch] {mark} {res['caseId']} ({res['elapsedSec']}s)")
+    return res
+
+
+async def run_batch(
+    items: List[BatchItem],
+    runner: Runner,
+    workers: int,
+    manifest_path: Path,
+    max_cases: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Run every case with at most `workers` cases in flight and write the results manifest.
+
+    Stage 1 and the policy steps are cheap; almost all wall time is spent
+    waiting on the LLM backend in worker threads. Each case has up to two
+    blocking LLM calls in flight, so the loop's default executor is sized
+    to `2 * workers` threads.
+
+    `max_cases` (default `workers`) caps the cases in flight separately
+    from the LLM calls: the grouped-by-model runner keeps a window of
+    cases open at once and bounds its own LLM calls to `workers`.
+    """
+    workers = max(1, int(workers))
+    started_at = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=2 * workers, thread_name_prefix="llm")
+    loop.set_default_executor(executor)
+
+    sem = asyncio.Semaphore(max(1, int(max_cases or workers)))
+    try:
+        ordered = await asyncio.gather(*(
+            _run_one(runner, sem, case_id, case_dir) for case_id, case_dir in items
+        ))
+    finally:
+        executor.shutdown(wait=False)
+
+    failed = sum(1 for r in ordered if r["status"] != "ok")
+
+    manifest = {
+        "startedAt": started_at.isoformat(),
+        "finishedAt": datetime.now(timezone.utc).isoformat(),
+        "wallSec": round(time.perf_counter() - t0, 3),
+        "workers": workers,
+        "total": len(ordered),
+        "succeeded": len(ordered) - failed,
+        "failed": failed,
+        "results": ordered,
+    }
+
+    manifest_path.parent.mkdir(exist_ok=True, parents=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def default_manifest_path(out_dir: Path) -> Path:
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return out_dir / f"batch_{stamp}_manifest.json"
@@ -22,14 +22,13 @@ from pipeline.policy import (
     RECOMMENDATION_TEMPLATES,     # 🔥 新增：使用 policy.py 的文案模板
 )
 from pipeline.summary import build_case_summary
+from pipeline.config import get_config
+from pipeline.stage2_canonicalize import canonicalize_stage2
 
 # =============================================
 # file: src/pipeline/build.py
 # （最終組裝前再保險跑一次）
 # =============================================
-from __future__ import annotations
-from typing import Any, Dict
-from .stage2_canonicalize import canonicalize_stage2
 
 def assemble_final_output(stage2_raw: Any, **rest) -> Dict[str, Any]:
     stage2 = canonicalize_stage2(stage2_raw)  # <-- 保證讀得到 reason
@@ -99,7 +98,8 @@ def _build_recommendation(label: str, stage2_rec: dict | None) -> dict:
 def build_analysis(
     extracted: dict,
     stage2: dict,
-    model_name: str
+    model_name: str,
+    summary_model: str | None = None,
 ) -> Dict[str, Any]:
     """
     Build the final merged output:
@@ -151,11 +151,13 @@ def build_analysis(
     )
 
     # -------- Final human-readable summary ----------
+    # Outcome line is written by the Stage 3 model (config stage3_model),
+    # not by the Stage 2 model
     case_summary = build_case_summary(
         extracted,
         stage2,
         notes,
-        model_name,
+        summary_model or get_config().stage3_model,
     )
 
     return {
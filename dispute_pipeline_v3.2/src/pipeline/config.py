@@ -0,0 +1,205 @@
+# src/pipeline/config.py
+"""
+Runtime config: which model each LLM stage uses, and how to call it.
+
+Read from a JSON file (`--config`, env PIPELINE_CONFIG; e.g. the bundled
+config_cloud.json). Each stage is either a model name or a full entry:
+
+    {
+      "stage2_model": {"provider": "openai", "model": "gpt-4o-mini",
+                       "timeout": 60, "max_tokens": 1024, "concurrency": 16},
+      "stage3_model": "gemma3:1b"
+    }
+
+- stage2_model → Stage 2 SNAD classifier
+- stage3_model → outcome summary written into the Stage 3 caseSummary
+
+Optional `backends` sets limits per provider, shared by all its models
+(see pipeline.ratelimit):
+
+    "backends": {
+      "openai": {"requests_per_min": 500, "tokens_per_min": 200000,
+                 "max_in_flight": 32, "max_retries": 5, "timeout": 120},
+      "ollama": {"max_in_flight": 4, "timeout": 300}
+    }
+
+Env LLM_<BACKEND>_RPM / _TPM / _MAX_IN_FLIGHT / _MAX_RETRIES override
+the file.
+
+Without a file both stages use the local gemma3:1b (the previous
+hard-coded behaviour). An explicit `--model` still overrides Stage 2.
+
+pipeline.llm_clients applies the per-model settings (timeout,
+max_tokens, concurrency) when it builds the shared client for a model.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_MODEL = "gemma3:1b"
+
+# stage → key in the config file
+STAGE_KEYS = {"stage2": "stage2_model", "stage3": "stage3_model"}
+
+_PROVIDER_PREFIXES = ("openai", "fake", "ollama")
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    provider: str
+    model: str
+    timeout: Optional[float] = None       # seconds per request
+    max_tokens: Optional[int] = None      # completion cap (OpenAI max_tokens / Ollama num_predict)
+    concurrency: Optional[int] = None     # max requests in flight to this model, process-wide
+
+    @property
+    def name(self) -> str:
+        """The `--model` style name ('openai:gpt-4o-mini', 'gemma3:1b')."""
+        return self.model if self.provider == "ollama" else f"{self.provider}:{self.model}"
+
+    @classmethod
+    def parse(cls, entry: Any) -> "ModelConfig":
+        if isinstance(entry, str):
+            entry = {"model": entry}
+        if not isinstance(entry, dict) or not entry.get("model"):
+            raise ValueError(f"Model entry needs a 'model': {entry!r}")
+
+        model = str(entry["model"])
+        provider = entry.get("provider")
+        if provider is None:
+            prefix, sep, rest = model.partition(":")
+            if sep and prefix in _PROVIDER_PREFIXES:
+                provider, model = prefix, rest
+            else:
+                provider = "ollama"
+
+        def _num(key, cast):
+            v = entry.get(key)
+            return None if v is None else cast(v)
+
+        return cls(
+            provider=str(provider),
+            model=model,
+            timeout=_num("timeout", float),
+            max_tokens=_num("max_tokens", int),
+            concurrency=_num("concurrency", int),
+        )
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    requests_per_min: Optional[float] = None    # None = unlimited
+    tokens_per_min: Optional[float] = None
+    max_in_flight: Optional[int] = None
+    max_retries: int = 5
+    timeout: Optional[float] = None             # default request timeout (a model's own timeout wins)
+
+    @classmethod
+    def parse(cls, entry: Dict[str, Any], base: "BackendConfig | None" = None) -> "BackendConfig":
+        base = base or cls()
+        if not isinstance(entry, dict):
+            raise ValueError(f"Backend entry must be an object: {entry!r}")
+        unknown = set(entry) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Unknown backend settings: {sorted(unknown)}")
+        return replace(base, **entry)
+
+
+# Tier-1 OpenAI limits for gpt-4o-mini; Ollama serves 4 requests in parallel by default
+DEFAULT_BACKENDS = {
+    "openai": BackendConfig(requests_per_min=500, tokens_per_min=200_000, max_in_flight=32, timeout=120),
+    "ollama": BackendConfig(max_in_flight=4, timeout=300),
+}
+
+_BACKEND_ENV = {
+    "RPM": ("requests_per_min", float),
+    "TPM": ("tokens_per_min", float),
+    "MAX_IN_FLIGHT": ("max_in_flight", int),
+    "MAX_RETRIES": ("max_retries", int),
+}
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    stages: Dict[str, ModelConfig] = field(default_factory=lambda: {
+        stage: ModelConfig("ollama", DEFAULT_MODEL) for stage in STAGE_KEYS
+    })
+    backends: Dict[str, BackendConfig] = field(default_factory=lambda: dict(DEFAULT_BACKENDS))
+    source: Optional[str] = None
+
+    def backend(self, name: str) -> BackendConfig:
+        cfg = self.backends.get(name) or BackendConfig()
+        overrides = {}
+        for suffix, (attr, cast) in _BACKEND_ENV.items():
+            value = os.getenv(f"LLM_{name.upper()}_{suffix}")
+            if value:
+                # 0 = unlimited for the limit settings
+                overrides[attr] = cast(value) if (attr == "max_retries" or float(value) > 0) else None
+        return replace(cfg, **overrides) if overrides else cfg
+
+    def stage(self, stage: str) -> ModelConfig:
+        return self.stages[stage]
+
+    @property
+    def stage2_model(self) -> str:
+        return self.stages["stage2"].name
+
+    @property
+    def stage3_model(self) -> str:
+        return self.stages["stage3"].name
+
+    def model_settings(self, model_name: str) -> Optional[ModelConfig]:
+        """Settings for a model name, from the first stage that uses it."""
+        for stage in STAGE_KEYS:
+            cfg = self.stages[stage]
+            if cfg.name == model_name:
+                return cfg
+        return None
+
+
+def load_config(path: str | Path) -> RuntimeConfig:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    stages = RuntimeConfig().stages.copy()
+    for stage, key in STAGE_KEYS.items():
+        if data.get(key) is not None:
+            try:
+                stages[stage] = ModelConfig.parse(data[key])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{path}: invalid {key}: {e}") from None
+    backends = dict(DEFAULT_BACKENDS)
+    for name, entry in (data.get("backends") or {}).items():
+        try:
+            backends[name] = BackendConfig.parse(entry, backends.get(name))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{path}: invalid backends.{name}: {e}") from None
+    return RuntimeConfig(stages=stages, backends=backends, source=str(path))
+
+
+_lock = threading.Lock()
+_config: Optional[RuntimeConfig] = None
+
+
+def get_config() -> RuntimeConfig:
+    """Process-wide config (PIPELINE_CONFIG file if set, else defaults)."""
+    global _config
+    with _lock:
+        if _config is None:
+            path = os.getenv("PIPELINE_CONFIG")
+            _config = load_config(path) if path else RuntimeConfig()
+        return _config
+
+
+def set_config(config: RuntimeConfig | str | Path) -> RuntimeConfig:
+    """Install a config (object or file path); call before the first LLM client is built."""
+    global _config
+    if not isinstance(config, RuntimeConfig):
+        config = load_config(config)
+    with _lock:
+        _config = config
+    return config
@@ -0,0 +1,41 @@
+# src/pipeline/env.py
+"""
+.env loading without paying for python-dotenv on every start.
+
+load_dotenv() used to run at import time in two modules. `load_env()`
+does the same lookup (the working directory and this package's
+directory, walking up) and only imports dotenv when a .env file
+actually exists. Safe to call more than once.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+_loaded = False
+
+
+def find_env_file() -> Optional[Path]:
+    for start in (Path.cwd(), Path(__file__).resolve().parent):
+        for d in (start, *start.parents):
+            candidate = d / ".env"
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def load_env():
+    """Load the nearest .env into os.environ (existing variables win)."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+
+    path = find_env_file()
+    if path is None:
+        return
+
+    from dotenv import load_dotenv
+
+    load_dotenv(path)
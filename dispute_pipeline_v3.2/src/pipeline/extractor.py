@@ -22,6 +22,20 @@ def gen_eligibility_notes(method: str, hours: int | None, completed: bool | None
     return f"{m}; opened ~{h}h after pickup; {status}"
 
 
+# ---------------------------------------------------------
+#  Timeline line
+# ---------------------------------------------------------
+def timeline_line(msg: Any) -> Optional[str]:
+    """'2025-10-07 20:05 | Buyer: text', or None if the message is incomplete."""
+    if isinstance(msg, dict):
+        t = msg.get("timestamp")
+        sender = msg.get("sender")
+        text = msg.get("text")
+        if t and sender and text:
+            return f"{t} | {sender}: {text}"
+    return None
+
+
 # ---------------------------------------------------------
 #  Stage 1 Extractor
 # ---------------------------------------------------------
@@ -43,14 +57,7 @@ def extract_case(raw_data: dict) -> dict:
     ]
 
     # Full timeline text (very important for LLM)
-    timeline = []
-    for msg in chat:
-        if isinstance(msg, dict):
-            t = msg.get("timestamp")
-            sender = msg.get("sender")
-            text = msg.get("text")
-            if t and sender and text:
-                timeline.append(f"{t} | {sender}: {text}")
+    timeline = [line for line in map(timeline_line, chat) if line]
 
     # Build a FULL raw listing text for LLM
     # (舊版輸出靠這個，reason 才會正確生成)
@@ -79,3 +86,27 @@ def extract_case(raw_data: dict) -> dict:
         "disputeOpenedAfterHours": raw_data.get("disputeOpenedAfterHours"),
         "orderCompleted": raw_data.get("orderCompleted"),
     }
+
+
+# ---------------------------------------------------------
+#  Incremental update (new chat messages)
+# ---------------------------------------------------------
+def append_messages(extracted: dict, messages: List[dict]) -> List[str]:
+    """
+    Append newly posted chat messages to an already extracted case,
+    IN PLACE (timeline, rawChatText, highlightedIssues) — same result
+    as re-running extract_case on the longer chat log.
+
+    Returns the new timeline lines.
+    """
+    new_lines = [line for line in map(timeline_line, messages) if line]
+
+    extracted.setdefault("timeline", []).extend(new_lines)
+    extracted.setdefault("highlightedIssues", []).extend(
+        m for m in messages if isinstance(m, dict) and m.get("highlight") is True
+    )
+    if new_lines:
+        prev = extracted.get("rawChatText") or ""
+        extracted["rawChatText"] = prev + ("\n" if prev else "") + "\n".join(new_lines)
+
+    return new_lines
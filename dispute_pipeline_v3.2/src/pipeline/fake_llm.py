@@ -0,0 +1,162 @@
+# src/pipeline/fake_llm.py
+"""
+Deterministic fake LLM for benchmarks and offline runs.
+
+Built by pipeline.llm_clients for the "fake" provider, so any stage
+accepts model names like "fake:stage2" or "fake:summary".
+
+Behaviour:
+- Stage 2 prompts → replay a recorded `*_stage2_raw.txt` (written by
+  `--debug-dump`), picked by a stable hash of the prompt, or a canned
+  verdict when no recordings exist
+- Outcome prompts → a fixed "Outcome: ..." line (chunk summaries in
+  map-reduce mode → a fixed sentence)
+- Each call sleeps `latency_ms ± jitter_ms` (seeded RNG → reproducible)
+- A `system=` prefix seen before is reported as cached prompt tokens
+  (mimics provider prefix caching)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from pipeline.tracing import record_llm_usage, span
+
+
+CANNED_STAGE2_OUTPUT = (
+    '{\n  "snadResult": {\n    "label": "Neutral",\n'
+    '    "reason": "No objective, material mismatch between the listing and the delivered item."\n  }\n}'
+)
+CANNED_OUTCOME = "Outcome: The parties have not yet agreed on a resolution."
+CANNED_CHUNK_SUMMARY = "The buyer and seller discussed the item and the dispute."
+
+# Module-level settings, applied to clients built after configure()
+# (env defaults let `--model fake:...` work straight from the CLI)
+_CONFIG = {
+    "replay_dir": Path(os.environ["FAKE_LLM_REPLAY_DIR"]) if os.getenv("FAKE_LLM_REPLAY_DIR") else None,
+    "latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+    "jitter_ms": float(os.getenv("FAKE_LLM_JITTER_MS", "0")),
+    "seed": int(os.getenv("FAKE_LLM_SEED", "0")),
+}
+
+
+def configure(
+    replay_dir: Optional[Path] = None,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    seed: int = 0,
+):
+    """Set fake-LLM behaviour. Call before the first fake client is created."""
+    _CONFIG.update(
+        replay_dir=Path(replay_dir) if replay_dir else None,
+        latency_ms=float(latency_ms),
+        jitter_ms=float(jitter_ms),
+        seed=int(seed),
+    )
+
+
+def load_recordings(replay_dir: Optional[Path]) -> List[str]:
+    if not replay_dir or not Path(replay_dir).is_dir():
+        return []
+    return [
+        p.read_text(encoding="utf-8")
+        for p in sorted(Path(replay_dir).glob("*_stage2_raw.txt"))
+    ]
+
+
+class FakeLLM:
+    def __init__(
+        self,
+        model_name: str,
+        recordings: List[str],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.model_name = model_name
+        self.recordings = recordings
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._seen_systems = set()
+        self.calls = 0
+
+    def _sleep(self):
+        with self._rng_lock:
+            self.calls += 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(0.0, self.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+
+    def _reply(self, prompt: str) -> str:
+        lowered = prompt.lower()
+        if "final outcome" in lowered:
+            return CANNED_OUTCOME
+        if "part of a c2c dispute chat" in lowered:
+            return CANNED_CHUNK_SUMMARY
+
+        if not self.recordings:
+            return CANNED_STAGE2_OUTPUT
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return self.recordings[int.from_bytes(digest[:8], "big") % len(self.recordings)]
+
+    def _record_usage(self, prompt: str, system: Optional[str], text: str):
+        # ~4 chars per token — good enough to compare prompt sizes
+        cached = None
+        if system:
+            with self._rng_lock:
+                cached = len(system) // 4 if system in self._seen_systems else 0
+                self._seen_systems.add(system)
+        prompt_tokens = (len(prompt) + len(system or "")) // 4
+        record_llm_usage(f"fake:{self.model_name}", prompt_tokens, len(text) // 4, cached_tokens=cached)
+
+    def invoke(
+        self,
+        prompt: str,
+        schema: Optional[dict] = None,
+        system: Optional[str] = None,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        with span("llm_call", model=f"fake:{self.model_name}"):
+            self._sleep()
+            text = self._reply(prompt)
+            self._record_usage(prompt, system, text)
+        return text
+
+    def invoke_json(
+        self,
+        prompt: str,
+        schema: Optional[dict] = None,
+        system: Optional[str] = None,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        # Local import: llm_clients imports this module lazily
+        from pipeline.llm_clients import read_until_object_closes
+
+        with span("llm_call", model=f"fake:{self.model_name}", stream=True) as rec:
+            self._sleep()
+            reply = self._reply(prompt)
+            pieces = (reply[i:i + 16] for i in range(0, len(reply), 16))
+            text, _, closed = read_until_object_closes(pieces)
+            rec["earlyStop"] = closed and len(text) < len(reply)
+            self._record_usage(prompt, system, text)
+        return text
+
+
+def build_fake_llm(model: str) -> FakeLLM:
+    return FakeLLM(
+        model,
+        recordings=load_recordings(_CONFIG["replay_dir"]),
+        latency_ms=_CONFIG["latency_ms"],
+        jitter_ms=_CONFIG["jitter_ms"],
+        seed=_CONFIG["seed"],
+    )
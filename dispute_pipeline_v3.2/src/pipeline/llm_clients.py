@@ -0,0 +1,524 @@
+# src/pipeline/llm_clients.py
+"""
+Process-wide LLM client registry.
+
+Every stage (Stage 2 classifier, Stage 3 outcome summarizer, API server)
+asks this module for its LLM instead of constructing one per call, so
+HTTP keep-alive connections and TLS sessions survive across cases.
+
+Model naming (same convention as the CLI `--model` flag):
+- "openai:gpt-4o-mini" → OpenAI chat completions
+- "gemma3:1b"          → local Ollama model
+- "fake:stage2"        → deterministic fake (pipeline.fake_llm, benchmarks)
+
+Wrappers expose `invoke(prompt)` (full completion) and
+`invoke_json(prompt)` (streamed; the request is cancelled as soon as
+the first top-level {...} object is complete — small models tend to
+keep chatting after the JSON ends). Both accept `schema=` (a JSON
+schema dict) to request constrained decoding: Ollama `format=`,
+OpenAI `response_format={"type": "json_schema", ...}`.
+
+Prefix caching: pass the large constant instructions as `system=` and
+only the per-case data as the prompt. OpenAI caches the shared prefix
+(routed by `cache_key=` → `prompt_cache_key`); Ollama keeps the model
+loaded for OLLAMA_KEEP_ALIVE_SESSION and reuses the evaluated system
+prefix from its KV cache.
+
+Per-model settings from pipeline.config (timeout, max_tokens,
+concurrency) are applied when the client is built; `concurrency` caps
+requests in flight to that model across all threads. On top of that,
+every request goes through its backend's governor (pipeline.ratelimit):
+requests/min + tokens/min buckets, adaptive max-in-flight, and retries
+with backoff on 429 / 5xx — the SDKs' own retries are switched off.
+
+Clients are cached by (provider, model). Each one owns a pooled httpx
+client; `shutdown_clients()` closes them all (also registered via atexit).
+`client_stats()` exposes creation / reuse / connection counters.
+
+httpx and the provider SDKs are imported when the first client of that
+provider is built, so importing the pipeline stays cheap (cached cases,
+summary triggers and the API process start without them).
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, Tuple
+
+from pipeline.config import ModelConfig, get_config
+from pipeline.postprocess import JsonRepairParser
+from pipeline.ratelimit import get_governor
+from pipeline.tracing import record_llm_usage, span
+
+if TYPE_CHECKING:
+    import httpx
+
+# Connection pool sizing (per client)
+POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "32"))
+POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "16"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+
+# How long Ollama keeps a model (and its KV cache) loaded after a call
+# ("30m", "2h", or "-1m" = never unload)
+OLLAMA_KEEP_ALIVE_SESSION = os.getenv("OLLAMA_KEEP_ALIVE_SESSION", "30m")
+
+
+# -----------------------------------
+# Counters
+# -----------------------------------
+class ClientStats:
+    """Thread-safe counters for one (provider, model) client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0              # get_llm() calls for this key
+        self.http_requests = 0        # requests sent through the pool
+        self.connections_opened = 0   # new TCP connections established
+
+    def incr(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "clientReuses": max(self.lookups - 1, 0),
+                "httpRequests": self.http_requests,
+                "connectionsOpened": self.connections_opened,
+                "connectionsReused": max(self.http_requests - self.connections_opened, 0),
+            }
+
+
+def _event_hooks(stats: ClientStats) -> Dict[str, list]:
+    """
+    httpx hooks: count every request, and use the httpcore `trace`
+    extension to count only requests that had to open a new connection.
+    """
+
+    def _trace(event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            stats.incr("connections_opened")
+
+    def _on_request(request: httpx.Request):
+        stats.incr("http_requests")
+        request.extensions["trace"] = _trace
+
+    return {"request": [_on_request]}
+
+
+def _pool_limits() -> httpx.Limits:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _slots(concurrency: int | None):
+    """Per-client request limit (a no-op context when unlimited)."""
+    if concurrency and concurrency > 0:
+        return threading.BoundedSemaphore(concurrency)
+    return contextlib.nullcontext()
+
+
+def _estimate_tokens(prompt: str, system: str | None, max_tokens: int | None) -> int:
+    # What a tokens/min limit counts: the prompt (~4 chars/token) plus the completion cap
+    return (len(prompt) + len(system or "")) // 4 + (max_tokens or 0)
+
+
+def _ollama_used_tokens(prompt: str, system: str | None, prompt_tokens: int | None, completion: int | None) -> int:
+    """
+    Tokens to settle an Ollama call with. Ollama leaves out prompt_eval_count
+    when the prompt came from its cache, and an early-stopped stream never
+    gets the final chunk with the counts → estimate what is missing.
+    """
+    if prompt_tokens is None:
+        prompt_tokens = _estimate_tokens(prompt, system, 0)
+    return prompt_tokens + (completion or 0)
+
+
+def _timeout(provider: str, settings: ModelConfig | None) -> float | None:
+    return (settings and settings.timeout) or get_config().backend(provider).timeout
+
+
+def read_until_object_closes(pieces: Iterable[str]) -> Tuple[str, int, bool]:
+    """
+    Consume streamed text until the first top-level JSON object closes.
+    Returns (text so far, chunks read, closed?); once closed, the text
+    ends at the closing brace — whatever the last chunk carried after it
+    is dropped. The caller closes the stream — that is what cancels
+    generation on the server side.
+    """
+    parser = JsonRepairParser()
+    parts = []
+    for piece in pieces:
+        if not piece:
+            continue
+        if parser.feed(piece):
+            parts.append(piece[: parser.close_offset])
+            return "".join(parts), len(parts), True
+        parts.append(piece)
+    return "".join(parts), len(parts), False
+
+
+def _openai_response_format(schema: dict | None) -> Dict[str, Any]:
+    if not schema:
+        return {}
+    return {
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": schema.get("title", "output"), "schema": schema, "strict": True},
+        }
+    }
+
+
+def _openai_messages(prompt: str, system: str | None) -> list:
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _cached_prompt_tokens(usage) -> int | None:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None)
+
+
+# -----------------------------------
+# Provider wrappers
+# -----------------------------------
+class OpenAILLMWrapper:
+    def __init__(
+        self,
+        model_name: str,
+        http_client: httpx.Client | None = None,
+        settings: ModelConfig | None = None,
+    ):
+        from openai import OpenAI
+
+        key = os.getenv("OPENAI_API_KEY")
+        if not key:
+            raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
+
+        timeout = _timeout("openai", settings)
+        self.client = OpenAI(
+            api_key=key,
+            http_client=http_client,
+            max_retries=0,   # retries / backoff: pipeline.ratelimit
+            **({"timeout": timeout} if timeout else {}),
+        )
+        self.model_name = model_name
+        self.max_tokens = (settings and settings.max_tokens) or 2048   # 足夠你的 JSON 輸出
+        self.slots = _slots(settings and settings.concurrency)
+        self.governor = get_governor("openai")
+
+    def invoke(
+        self,
+        prompt: str,
+        schema: dict | None = None,
+        system: str | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        """
+        Simulate the same interface as OllamaLLM.invoke(prompt),
+        returning ONLY the model's text output.
+        """
+
+        def attempt():
+            with span("llm_call", model=f"openai:{self.model_name}"):
+                response = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=_openai_messages(prompt, system),
+                    temperature=0,
+                    max_tokens=self.max_tokens,
+                    **_openai_response_format(schema),
+                    **({"prompt_cache_key": cache_key} if cache_key else {}),
+                )
+
+                usage = getattr(response, "usage", None)
+                record_llm_usage(
+                    f"openai:{self.model_name}",
+                    getattr(usage, "prompt_tokens", None),
+                    getattr(usage, "completion_tokens", None),
+                    cached_tokens=_cached_prompt_tokens(usage),
+                )
+            return response
+
+        estimate = _estimate_tokens(prompt, system, self.max_tokens)
+        with self.slots:
+            response = self.governor.call(attempt, tokens=estimate)
+        self.governor.settle(estimate, getattr(getattr(response, "usage", None), "total_tokens", None))
+
+        return response.choices[0].message.content
+
+    def invoke_json(
+        self,
+        prompt: str,
+        schema: dict | None = None,
+        system: str | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        """Streamed `invoke`: stop reading once the JSON object is complete."""
+
+        def attempt():
+            usage = None
+            with span("llm_call", model=f"openai:{self.model_name}", stream=True) as rec:
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=_openai_messages(prompt, system),
+                    temperature=0,
+                    max_tokens=self.max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **_openai_response_format(schema),
+                    **({"prompt_cache_key": cache_key} if cache_key else {}),
+                )
+
+                def pieces():
+                    nonlocal usage
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None) is not None:
+                            usage = chunk.usage
+                        if chunk.choices:
+                            yield chunk.choices[0].delta.content or ""
+
+                try:
+                    text, n_chunks, closed = read_until_object_closes(pieces())
+                finally:
+                    stream.close()   # drops the connection → server stops generating
+
+                rec["earlyStop"] = closed and usage is None
+                completion = getattr(usage, "completion_tokens", None) or n_chunks
+                prompt_tokens = getattr(usage, "prompt_tokens", None)
+                record_llm_usage(
+                    f"openai:{self.model_name}",
+                    prompt_tokens,
+                    completion,
+                    cached_tokens=_cached_prompt_tokens(usage),
+                )
+            return text, (prompt_tokens + completion) if prompt_tokens is not None else None
+
+        estimate = _estimate_tokens(prompt, system, self.max_tokens)
+        with self.slots:
+            text, used = self.governor.call(attempt, tokens=estimate)
+        self.governor.settle(estimate, used)
+
+        return text
+
+    def close(self):
+        self.client.close()
+
+
+class OllamaLLMWrapper:
+    """
+    Thin wrapper over langchain's OllamaLLM with the same `invoke(prompt)`
+    interface, which also reports Ollama's eval counts as token usage.
+    """
+
+    def __init__(self, llm, concurrency: int | None = None):
+        self.llm = llm
+        self.model_name = llm.model
+        self.slots = _slots(concurrency)
+        self.governor = get_governor("ollama")
+
+    @staticmethod
+    def _kwargs(schema: dict | None, system: str | None) -> Dict[str, Any]:
+        # Extra kwargs are passed through to ollama.Client.generate
+        kwargs: Dict[str, Any] = {}
+        if schema:
+            kwargs["format"] = schema
+        if system:
+            kwargs["system"] = system
+        return kwargs
+
+    def invoke(
+        self,
+        prompt: str,
+        schema: dict | None = None,
+        system: str | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        kwargs = self._kwargs(schema, system)
+
+        def attempt():
+            with span("llm_call", model=self.model_name):
+                result = self.llm.generate([prompt], **kwargs)
+                gen = result.generations[0][0]
+                info = gen.generation_info or {}
+                record_llm_usage(self.model_name, info.get("prompt_eval_count"), info.get("eval_count"))
+            return gen
+
+        estimate = _estimate_tokens(prompt, system, self.llm.num_predict)
+        with self.slots:
+            gen = self.governor.call(attempt, tokens=estimate)
+        info = gen.generation_info or {}
+        self.governor.settle(
+            estimate,
+            _ollama_used_tokens(prompt, system, info.get("prompt_eval_count"), info.get("eval_count")),
+        )
+
+        return gen.text
+
+    def invoke_json(
+        self,
+        prompt: str,
+        schema: dict | None = None,
+        system: str | None = None,
+        cache_key: str | None = None,
+    ) -> str:
+        """Streamed `invoke`: stop reading once the JSON object is complete."""
+        kwargs = self._kwargs(schema, system)
+
+        def attempt():
+            with span("llm_call", model=self.model_name, stream=True) as rec:
+                stream = self.llm.stream(prompt, **kwargs)
+                try:
+                    text, n_chunks, closed = read_until_object_closes(stream)
+                finally:
+                    stream.close()   # closes the HTTP response → Ollama aborts the generation
+
+                rec["earlyStop"] = closed
+                # Ollama streams ~one token per chunk; eval counts only arrive with the final chunk
+                record_llm_usage(self.model_name, None, n_chunks)
+            return text, n_chunks
+
+        estimate = _estimate_tokens(prompt, system, self.llm.num_predict)
+        with self.slots:
+            text, n_chunks = self.governor.call(attempt, tokens=estimate)
+        # The final chunk (with the real counts) never arrives after an early stop:
+        # settle with the estimated prompt + one token per chunk read
+        self.governor.settle(estimate, _ollama_used_tokens(prompt, system, None, n_chunks))
+        return text
+
+    def warm(self, keep_alive: str | None = None):
+        """
+        Load the model into memory without generating anything (empty
+        prompt) and keep it loaded for `keep_alive`.
+        """
+        with span("model_warmup", model=self.model_name):
+            self.llm._client.generate(
+                model=self.model_name,
+                prompt="",
+                keep_alive=keep_alive or OLLAMA_KEEP_ALIVE_SESSION,
+            )
+
+    def close(self):
+        # OllamaLLM keeps its ollama.Client as a private attribute
+        sync_client = getattr(self.llm, "_client", None)
+        if sync_client is not None:
+            sync_client.close()
+
+
+def _build_openai(model: str, stats: ClientStats, settings: ModelConfig | None = None):
+    from openai import DefaultHttpxClient
+
+    http_client = DefaultHttpxClient(limits=_pool_limits(), event_hooks=_event_hooks(stats))
+    return OpenAILLMWrapper(model, http_client=http_client, settings=settings)
+
+
+def _build_ollama(model: str, stats: ClientStats, settings: ModelConfig | None = None):
+    try:
+        from langchain_ollama import OllamaLLM  # type: ignore
+    except Exception:  # pragma: no cover
+        raise RuntimeError(
+            "langchain-ollama is not installed. "
+            "Please run: pip install langchain-ollama"
+        )
+
+    client_kwargs: Dict[str, Any] = {"limits": _pool_limits(), "event_hooks": _event_hooks(stats)}
+    timeout = _timeout("ollama", settings)
+    if timeout:
+        client_kwargs["timeout"] = timeout
+
+    # Hooks are sync callables → only valid on the sync httpx client.
+    return OllamaLLMWrapper(OllamaLLM(
+        model=model,
+        keep_alive=OLLAMA_KEEP_ALIVE_SESSION,
+        num_predict=settings.max_tokens if settings else None,
+        sync_client_kwargs=client_kwargs,
+    ), concurrency=settings.concurrency if settings else None)
+
+
+def _build_fake(model: str, stats: ClientStats, settings: ModelConfig | None = None):
+    from pipeline.fake_llm import build_fake_llm
+
+    return build_fake_llm(model)
+
+
+def _close_client(llm: Any):
+    if hasattr(llm, "close"):
+        llm.close()
+
+
+# -----------------------------------
+# Registry
+# -----------------------------------
+_LOCK = threading.Lock()
+_CLIENTS: Dict[Tuple[str, str], Any] = {}
+_STATS: Dict[Tuple[str, str], ClientStats] = {}
+
+# provider prefix → builder(model, stats, settings)
+_PROVIDERS: Dict[str, Callable[[str, ClientStats, Optional[ModelConfig]], Any]] = {
+    "openai": _build_openai,
+    "ollama": _build_ollama,
+    "fake": _build_fake,
+}
+
+
+def parse_model_name(model_name: str) -> Tuple[str, str]:
+    """
+    'openai:gpt-4o-mini' → ('openai', 'gpt-4o-mini').
+    Unknown prefixes are Ollama tags ('gemma3:1b' → ('ollama', 'gemma3:1b')).
+    """
+    prefix, sep, rest = model_name.partition(":")
+    if sep and prefix != "ollama" and prefix in _PROVIDERS:
+        return prefix, rest
+    return "ollama", model_name
+
+
+def get_llm(model_name: str):
+    """
+    Return the shared client for `model_name`, creating it on first use.
+    """
+    key = parse_model_name(model_name)
+
+    with _LOCK:
+        stats = _STATS.setdefault(key, ClientStats())
+        stats.incr("lookups")
+
+        llm = _CLIENTS.get(key)
+        if llm is None:
+            provider, model = key
+            settings = get_config().model_settings(model if provider == "ollama" else f"{provider}:{model}")
+            llm = _PROVIDERS[provider](model, stats, settings)
+            _CLIENTS[key] = llm
+
+    return llm
+
+
+def client_stats() -> Dict[str, Dict[str, int]]:
+    """Counters per client, keyed as 'provider:model'."""
+    with _LOCK:
+        items = list(_STATS.items())
+    return {f"{p}:{m}": s.as_dict() for (p, m), s in items}
+
+
+def shutdown_clients():
+    """Close every pooled client. Safe to call more than once."""
+    with _LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+
+    for llm in clients:
+        try:
+            _close_client(llm)
+        except Exception:
+            pass
+
+
+atexit.register(shutdown_clients)
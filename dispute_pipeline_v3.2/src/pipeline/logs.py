@@ -0,0 +1,163 @@
+# src/pipeline/logs.py
+"""
+Pipeline logging — leveled, sampled, rate-limited, non-blocking.
+
+- Every module logs under the "pipeline" logger tree
+  (e.g. logging.getLogger("pipeline.stage2")).
+- `configure_logging()` puts a QueueHandler on the "pipeline" logger;
+  a QueueListener thread does the actual formatting + writing, so a
+  slow terminal / log collector never stalls a worker thread.
+- A token-bucket filter caps records per second (`rate_per_sec`, burst
+  = 2× rate). Dropped records are counted and reported once the bucket
+  refills ("suppressed N log records").
+- Bulky payloads (raw LLM output) are logged at DEBUG and only for a
+  sampled fraction of cases: `sample_case(case_id)` is a stable hash,
+  so a case is either fully in or fully out of the sample.
+
+Settings (CLI flags override env):
+    PIPELINE_LOG_LEVEL        INFO
+    PIPELINE_LOG_SAMPLE       0.1   (fraction of cases with raw output logged)
+    PIPELINE_LOG_RATE         50    (records / second, 0 = unlimited)
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+ROOT_LOGGER = "pipeline"
+
+_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(caseId)s] %(message)s"
+
+_state = {
+    "sample": float(os.getenv("PIPELINE_LOG_SAMPLE", "0.1")),
+    "listener": None,
+    "handler": None,
+}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """'stage2' → logger 'pipeline.stage2'."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def sample_case(case_id: Optional[str]) -> bool:
+    """Deterministic per-case sampling for verbose (DEBUG) payloads."""
+    rate = _state["sample"]
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    digest = hashlib.sha1(str(case_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 < rate
+
+
+# -----------------------------------
+# Filters
+# -----------------------------------
+class _CaseIdDefault(logging.Filter):
+    """Make %(caseId)s safe for records logged without extra={"caseId": ...}."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "caseId"):
+            record.caseId = "-"
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket over all pipeline records. WARNING and above always pass.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        super().__init__()
+        self.rate = float(rate_per_sec)
+        self.capacity = max(1.0, 2 * self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens < 1.0:
+                self.suppressed += 1
+                return False
+
+            self.tokens -= 1.0
+            if self.suppressed:
+                record.msg = f"{record.msg} (suppressed {self.suppressed} log records)"
+                self.suppressed = 0
+        return True
+
+
+# -----------------------------------
+# Setup
+# -----------------------------------
+def configure_logging(
+    level: Optional[str] = None,
+    sample: Optional[float] = None,
+    rate_per_sec: Optional[float] = None,
+    stream=None,
+):
+    """
+    Install the queued handler on the "pipeline" logger. Calling it again
+    replaces the previous setup (level / sample / rate can be changed).
+    """
+    shutdown_logging()
+
+    level = (level or os.getenv("PIPELINE_LOG_LEVEL", "INFO")).upper()
+    if sample is not None:
+        _state["sample"] = float(sample)
+    if rate_per_sec is None:
+        rate_per_sec = float(os.getenv("PIPELINE_LOG_RATE", "50"))
+
+    sink = logging.StreamHandler(stream)
+    sink.setFormatter(logging.Formatter(_FORMAT))
+
+    # Unbounded queue: the producer side never blocks; the rate limiter
+    # keeps it from growing without bound.
+    q: queue.Queue = queue.Queue(-1)
+    handler = QueueHandler(q)
+    handler.addFilter(_CaseIdDefault())
+    handler.addFilter(RateLimitFilter(rate_per_sec))
+
+    listener = QueueListener(q, sink, respect_handler_level=False)
+    listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _state["listener"] = listener
+    _state["handler"] = handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    handler = _state["handler"]
+    listener = _state["listener"]
+    if handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(handler)
+    if listener is not None:
+        listener.stop()
+    _state["handler"] = None
+    _state["listener"] = None
+
+
+atexit.register(shutdown_logging)
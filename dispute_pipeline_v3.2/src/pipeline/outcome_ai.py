@@ -11,41 +11,81 @@ ONE-LINE English summary of the final dispute outcome.
 - 回傳一行 "Outcome sentence"
 
 不決定 SNAD / Neutral，也不處理 policy，只是寫一句話而已。
+
+Modes
+-----
+- "tail"      → only the last 5 messages, one LLM call (default, fast)
+- "mapreduce" → whole timeline: fixed-size chunks are summarized in
+                parallel (map), then the chunk summaries + last messages
+                are reduced into the one-line Outcome. Catches outcomes
+                agreed earlier in long chats.
+
+Map-reduce details:
+- chunks are aligned from the FIRST message, so appending new messages
+  only changes the last chunk
+- chunk summaries are cached in-process (LRU, keyed by model + chunk
+  position + chunk text) → inside the API / daemon a re-run after new
+  messages re-summarizes one chunk only; the cache is not persisted, so
+  every CLI run starts empty
+- map calls share one pool of OUTCOME_MAP_CONCURRENCY threads, which
+  caps concurrent summarizer calls across all cases
+
+Env: OUTCOME_MODE, OUTCOME_CHUNK_MESSAGES (20),
+     OUTCOME_MAP_CONCURRENCY (4), OUTCOME_CHUNK_CACHE_SIZE (4096)
 """
 
 from __future__ import annotations
 
+import contextvars
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
-try:
-    # 直接在這裡 import，避免循環依賴
-    from langchain_ollama import OllamaLLM  # type: ignore
-except Exception as e:  # pragma: no cover
-    # 如果沒裝的話，等真正呼叫時才丟錯即可
-    OllamaLLM = None  # type: ignore
+from pipeline.llm_clients import get_llm
+from pipeline.tracing import incr, span
+
+OUTCOME_MODES = ("tail", "mapreduce")
+DEFAULT_OUTCOME_MODE = os.getenv("OUTCOME_MODE", "tail")
+
+CHUNK_MESSAGES = int(os.getenv("OUTCOME_CHUNK_MESSAGES", "20"))
+MAP_CONCURRENCY = int(os.getenv("OUTCOME_MAP_CONCURRENCY", "4"))
+CHUNK_CACHE_SIZE = int(os.getenv("OUTCOME_CHUNK_CACHE_SIZE", "4096"))
 
 
 def _get_llm(model_name: str):
     """
-    Internal helper to build an Ollama LLM instance.
+    Internal helper to fetch the shared LLM client for the summarizer.
 
     model_name 例如：
     - "gemma3:1b"
     - "gemma3:2b"
 
+    Client 由 pipeline.llm_clients 共用（同一個 model 只建立一次）。
     若沒有安裝 langchain-ollama，會在第一次呼叫時報錯。
     """
-    if OllamaLLM is None:
-        raise RuntimeError(
-            "langchain-ollama is not installed. "
-            "Please run: pip install langchain-ollama"
-        )
-    return OllamaLLM(model=model_name)
+    return get_llm(model_name)
+
+
+def _parse_outcome(raw: str) -> str:
+    raw = raw.strip()
+
+    # 確保格式是 "Outcome: ..."
+    lower = raw.lower()
+    if lower.startswith("outcome:"):
+        # 去掉前綴，只留後面那句話
+        return raw[len("Outcome:"):].strip()
+
+    # 如果模型沒完全照格式，也直接拿整句當結果
+    return raw
 
 
 def ai_summarize_outcome(
     timeline: List[str],
     model_name: str,
+    mode: Optional[str] = None,
 ) -> Optional[str]:
     """
     Use LLM to summarize the final outcome of this dispute
@@ -58,6 +98,8 @@ def ai_summarize_outcome(
         "2025-10-07 20:12 | Seller: The screen is genuine Apple..."
     model_name : str
         要給 Ollama 的模型名稱，例如 "gemma3:1b"
+    mode : str, optional
+        "tail" / "mapreduce"，預設看 OUTCOME_MODE
 
     Returns
     -------
@@ -68,6 +110,12 @@ def ai_summarize_outcome(
     if not timeline:
         return None
 
+    mode = mode or DEFAULT_OUTCOME_MODE
+    if mode == "mapreduce" and len(timeline) > 5:
+        return _summarize_mapreduce(timeline, model_name)
+    if mode not in OUTCOME_MODES:
+        raise ValueError(f"Unknown outcome mode: {mode!r} (expected one of {OUTCOME_MODES})")
+
     # 抓最後 3~5 則訊息（多數時候最後幾句就是協調結果）
     recent_lines = timeline[-5:]
     recent = "\n".join(recent_lines)
@@ -89,14 +137,129 @@ Output format:
 Outcome: <one short sentence>
 """.strip()
 
-    llm = _get_llm(model_name)
-    raw = llm.invoke(prompt).strip()
+    with span("outcome_summary", model=model_name):
+        llm = _get_llm(model_name)
+        raw = llm.invoke(prompt)
 
-    # 確保格式是 "Outcome: ..."
-    lower = raw.lower()
-    if lower.startswith("outcome:"):
-        # 去掉前綴，只留後面那句話
-        return raw[len("Outcome:"):].strip()
+    return _parse_outcome(raw)
 
-    # 如果模型沒完全照格式，也直接拿整句當結果
-    return raw
+
+# -----------------------------------
+# Map-reduce mode
+# -----------------------------------
+_CHUNK_PROMPT = """
+Summarize this part of a C2C dispute chat in 1-2 short English sentences.
+
+Rules:
+- Focus on claims, offers, agreements and refusals.
+- Do NOT quote messages, timestamps or usernames.
+- Do NOT invent details.
+
+Chat part {index} of {total}:
+{chunk}
+""".strip()
+
+_REDUCE_PROMPT = """
+Summarize the final outcome of this C2C dispute in ONE short English sentence.
+
+Rules:
+- Use the part summaries (in chronological order) and the latest messages.
+- An agreement reached earlier still counts unless later messages change it.
+- Do NOT quote the chat message.
+- Do NOT invent details.
+- Output must be a single short sentence.
+
+Part summaries:
+{summaries}
+
+Latest messages:
+{recent}
+
+Output format:
+Outcome: <one short sentence>
+""".strip()
+
+
+class _ChunkCache:
+    """Small thread-safe LRU: sha256(model, chunk) → chunk summary."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_chunk_cache = _ChunkCache(CHUNK_CACHE_SIZE)
+_map_pool: Optional[ThreadPoolExecutor] = None
+_map_pool_lock = threading.Lock()
+
+
+def _get_map_pool() -> ThreadPoolExecutor:
+    global _map_pool
+    with _map_pool_lock:
+        if _map_pool is None:
+            _map_pool = ThreadPoolExecutor(max_workers=MAP_CONCURRENCY, thread_name_prefix="outcome-map")
+        return _map_pool
+
+
+def _chunk_key(model_name: str, chunk: List[str], index: int) -> str:
+    # The prompt's `total` is left out on purpose: when new messages open
+    # another chunk, every earlier chunk would miss. A summary written for
+    # "part 2 of 2" still describes part 2 of 3 correctly.
+    h = hashlib.sha256(f"{model_name}\n{index}".encode("utf-8"))
+    for line in chunk:
+        h.update(b"\n")
+        h.update(line.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _summarize_chunk(model_name: str, chunk: List[str], index: int, total: int) -> str:
+    key = _chunk_key(model_name, chunk, index)
+    cached = _chunk_cache.get(key)
+    if cached is not None:
+        incr("outcome_chunk_cache", result="hit")
+        return cached
+
+    incr("outcome_chunk_cache", result="miss")
+    prompt = _CHUNK_PROMPT.format(index=index, total=total, chunk="\n".join(chunk))
+    with span("outcome_map", model=model_name, chunk=index):
+        summary = _get_llm(model_name).invoke(prompt).strip()
+
+    _chunk_cache.put(key, summary)
+    return summary
+
+
+def _summarize_mapreduce(timeline: List[str], model_name: str) -> str:
+    chunks = [timeline[i:i + CHUNK_MESSAGES] for i in range(0, len(timeline), CHUNK_MESSAGES)]
+    total = len(chunks)
+
+    with span("outcome_summary", model=model_name, mode="mapreduce", chunks=total):
+        pool = _get_map_pool()
+        # copy_context → map spans land in the calling case's trace
+        futures = [
+            pool.submit(contextvars.copy_context().run, _summarize_chunk, model_name, chunk, i + 1, total)
+            for i, chunk in enumerate(chunks)
+        ]
+        summaries = [f.result() for f in futures]
+
+        prompt = _REDUCE_PROMPT.format(
+            summaries="\n".join(f"{i + 1}. {s}" for i, s in enumerate(summaries)),
+            recent="\n".join(timeline[-5:]),
+        )
+        raw = _get_llm(model_name).invoke(prompt)
+
+    return _parse_outcome(raw)
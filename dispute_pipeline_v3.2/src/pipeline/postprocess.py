@@ -7,12 +7,16 @@ This module ensures:
 - Only allowed keys remain in snadResult (label + reason)
 - No hallucinated keys (e.g., "weight", "why", "score")
 - JSON formatting cleanup (remove trailing commas, quotes, comments)
+
+`JsonRepairParser` does all of the cleanup in one incremental scan
+(and accepts streamed chunks); the small per-step helpers are kept
+for callers that only need one of them.
 """
 
 from __future__ import annotations
 import json
 import re
-from typing import Dict, Any
+from typing import Any, Dict
 
 # Allowed keys inside snadResult
 ALLOWED_SNAD_KEYS = {"label", "reason"}
@@ -102,11 +106,226 @@ def coerce_to_json(text: str) -> str:
     """
     Perform all cleaning & return a JSON string ready for json.loads().
     """
-    s = extract_json_block(text)
-    s = strip_json_comments(s)
-    s = normalize_quotes(s)
-    s = fix_trailing_commas(s)
-    return s.strip()
+    parser = JsonRepairParser()
+    parser.feed(text)
+    return parser.text()
+
+
+# -------------------------------------------------------------
+# SINGLE-PASS REPAIR PARSER
+# -------------------------------------------------------------
+
+_DQUOTES = '"\u201c\u201d'          # " “ ”
+_SQUOTES = "\u2018\u2019"           # ‘ ’
+_CTRL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+# Runs of characters that need no special handling (bulk-copied)
+_STR_PLAIN = re.compile('[^"\\\\\u201c\u201d\u2018\u2019\n\r\t]+')
+_WS = re.compile(r"\s+")
+
+
+class JsonRepairParser:
+    """
+    Incremental, single-pass repair of LLM "almost JSON".
+
+    Feed raw model output (whole or in streamed chunks); the parser
+    keeps only the FIRST top-level {...} object and, in the same scan:
+    - skips everything around it (Markdown fences, prose)
+    - drops // line and /* block */ comments outside strings
+    - turns smart quotes into straight ones (“key” → "key", ‘ ’ → ')
+    - drops trailing commas before } or ]
+    - escapes raw newlines / tabs inside strings
+
+    `feed()` returns True as soon as the object is closed; later chunks
+    are ignored, and `close_offset` is the offset in the last fed chunk
+    just past the closing bracket (anything after it is not JSON). `result()` parses the repaired text (one json.loads);
+    if the stream ended early, open strings / brackets are closed first.
+
+    `repairs` counts edits made INSIDE the object (fences and prose
+    around it are not counted), so callers can tell clean output from
+    repaired output.
+    """
+
+    def __init__(self):
+        self._out: list = []
+        self._stack: list = []      # open brackets: "{" / "["
+        self._started = False
+        self.done = False
+        self.close_offset = None
+        self.repairs = 0
+
+        self._in_str = False
+        self._str_open = '"'        # quote char that opened the string
+        self._escape = False
+        self._comment = None        # None | "line" | "block"
+        self._slash = False         # saw "/" (maybe comment start)
+        self._star = False          # saw "*" inside block comment
+        self._comma = False         # comma held back until next token
+
+    # ---------------------------------------------------------
+    def feed(self, chunk: str) -> bool:
+        if self.done or not chunk:
+            return self.done
+
+        i = 0
+        n = len(chunk)
+        out = self._out
+
+        if not self._started:
+            i = chunk.find("{")
+            if i == -1:
+                return False
+            self._started = True
+            self._stack.append("{")
+            out.append("{")
+            i += 1
+
+        while i < n:
+            c = chunk[i]
+
+            # ---- inside a string ----
+            if self._in_str:
+                if self._escape:
+                    out.append(c)
+                    self._escape = False
+                    i += 1
+                    continue
+
+                m = _STR_PLAIN.match(chunk, i)
+                if m:
+                    out.append(m.group())
+                    i = m.end()
+                    continue
+
+                if c == "\\":
+                    out.append(c)
+                    self._escape = True
+                elif c == '"' or (c in _DQUOTES and self._str_open != '"'):
+                    if c != '"':
+                        self.repairs += 1
+                    out.append('"')
+                    self._in_str = False
+                elif c in _DQUOTES:
+                    # smart quote inside a "..." string → literal quote
+                    out.append('\\"')
+                    self.repairs += 1
+                elif c in _SQUOTES:
+                    out.append("'")
+                    self.repairs += 1
+                else:
+                    out.append(_CTRL_ESCAPES[c])
+                    self.repairs += 1
+                i += 1
+                continue
+
+            # ---- inside a comment ----
+            if self._comment == "line":
+                j = chunk.find("\n", i)
+                if j == -1:
+                    return False
+                self._comment = None
+                i = j + 1
+                continue
+
+            if self._comment == "block":
+                if self._star and c == "/":
+                    self._comment = None
+                self._star = c == "*"
+                i += 1
+                continue
+
+            if self._slash:
+                self._slash = False
+                if c == "/":
+                    self._comment = "line"
+                    self.repairs += 1
+                    i += 1
+                    continue
+                if c == "*":
+                    self._comment = "block"
+                    self._star = False
+                    self.repairs += 1
+                    i += 1
+                    continue
+                out.append("/")   # lone slash — let json.loads report it
+
+            # ---- structural ----
+            m = _WS.match(chunk, i)
+            if m:
+                i = m.end()
+                continue
+
+            if c == "/":
+                self._slash = True
+                i += 1
+                continue
+
+            if c in "}]":
+                if self._comma:
+                    self._comma = False
+                    self.repairs += 1
+                out.append(c)
+                if self._stack:
+                    self._stack.pop()
+                i += 1
+                if not self._stack:
+                    self.done = True
+                    self.close_offset = i
+                    return True
+                continue
+
+            if self._comma:
+                out.append(",")
+                self._comma = False
+
+            if c == ",":
+                self._comma = True
+            elif c in _DQUOTES:
+                if c != '"':
+                    self.repairs += 1
+                out.append('"')
+                self._in_str = True
+                self._str_open = c
+            elif c in "{[":
+                self._stack.append(c)
+                out.append(c)
+            else:
+                out.append(c)
+            i += 1
+
+        return self.done
+
+    # ---------------------------------------------------------
+    def text(self) -> str:
+        """Repaired JSON text; closes whatever is still open."""
+        if not self._started:
+            return ""
+        if self.done:
+            return "".join(self._out)
+
+        tail = []
+        if self._in_str:
+            if self._escape:
+                tail.append("\\")
+            tail.append('"')
+        for opener in reversed(self._stack):
+            tail.append("}" if opener == "{" else "]")
+        return "".join(self._out) + "".join(tail)
+
+    def result(self) -> Any:
+        """Parse the repaired object (raises ValueError if unrecoverable)."""
+        if not self._started:
+            raise ValueError("No JSON object found in Stage2 output")
+        if not self.done:
+            self.repairs += 1
+        return json.loads(self.text())
+
+
+def repair_json(text: str) -> Any:
+    """One-shot helper: repair + parse the first JSON object in `text`."""
+    parser = JsonRepairParser()
+    parser.feed(text)
+    return parser.result()
 
 
 # -------------------------------------------------------------
@@ -130,15 +349,9 @@ def postprocess_stage2_output(text):
     if not isinstance(text, str):
         raise TypeError(f"Stage2 output must be dict or str, got: {type(text)}")
 
-    # Continue with string-cleaning pipeline
-    cleaned = clean_json_output(text)
-    cleaned = extract_json_block(cleaned)
-    cleaned = strip_json_comments(cleaned)
-    cleaned = normalize_quotes(cleaned)
-    cleaned = fix_trailing_commas(cleaned)
-
+    # Single pass: fences / comments / quotes / trailing commas
     try:
-        data = json.loads(cleaned)
+        data = repair_json(text)
     except Exception:
         raise ValueError("Failed to parse Stage2 JSON output")
 
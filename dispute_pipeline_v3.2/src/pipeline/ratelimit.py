@@ -0,0 +1,241 @@
+# src/pipeline/ratelimit.py
+"""
+Per-backend LLM call governor (one per provider: openai, ollama).
+
+Every LLM request goes through `get_governor(provider).call(fn, tokens)`:
+
+1) token buckets — requests/min and tokens/min (OpenAI-style limits);
+   a request reserves its estimated tokens, the estimate is corrected
+   with the real usage afterwards (`settle`); a failed attempt gives
+   its reservation back, so retries are not charged twice
+2) max in flight — an adaptive limit (AIMD): halved on every 429 /
+   503, grown back by ~1 per limit's worth of successes, never above
+   `max_in_flight`
+3) retries with backoff on 429 / 5xx / connection errors — full-jitter
+   exponential, or the server's Retry-After. A throttle pauses the
+   whole backend, not just the failing thread, so a burst of workers
+   does not keep hammering a rate-limited API (no retry storms).
+
+Limits come from the runtime config (`backends` in the --config file,
+see pipeline.config) and env overrides LLM_<BACKEND>_RPM / _TPM /
+_MAX_IN_FLIGHT / _MAX_RETRIES.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from pipeline.config import BackendConfig, get_config
+from pipeline.logs import get_logger
+from pipeline.tracing import incr
+
+log = get_logger("ratelimit")
+
+T = TypeVar("T")
+
+BACKOFF_BASE = 0.5    # seconds
+BACKOFF_MAX = 60.0
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+# Exception class names (anywhere in the MRO) that mean "transient, retry"
+_RETRY_ERRORS = {
+    "APIConnectionError", "APITimeoutError",         # openai
+    "TransportError", "TimeoutException",            # httpx
+    "ConnectionError", "TimeoutError",               # builtins
+}
+
+
+class TokenBucket:
+    """`rate_per_min` units/min, burst up to one minute's worth. rate None → unlimited."""
+
+    def __init__(self, rate_per_min: Optional[float]):
+        self.rate = rate_per_min / 60.0 if rate_per_min else None
+        self.capacity = rate_per_min or 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, n: float, now: float) -> float:
+        """0 if `n` can be taken now, else seconds until it can (caller holds the lock)."""
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        n = min(n, self.capacity)   # oversized requests wait for a full bucket, not forever
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float):
+        if self.rate is not None:
+            self.tokens -= min(n, self.capacity)
+
+    def adjust(self, n: float):
+        """Give back (n > 0) or charge extra (n < 0) after the real usage is known."""
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + n)
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) and status > 0 else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRY_STATUS
+    return any(c.__name__ in _RETRY_ERRORS for c in type(exc).__mro__)
+
+
+class BackendGovernor:
+    def __init__(self, name: str, cfg: BackendConfig):
+        self.name = name
+        self.cfg = cfg
+        self.max_in_flight = cfg.max_in_flight or 0          # 0 = unlimited
+        self.limit = float(self.max_in_flight) if self.max_in_flight else 0.0
+        self.requests = TokenBucket(cfg.requests_per_min)
+        self.tokens = TokenBucket(cfg.tokens_per_min)
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0, "waitSec": 0.0}
+
+    # -----------------------------
+    # Admission
+    # -----------------------------
+    def _acquire(self, tokens: int):
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0 and self.max_in_flight and self._in_flight >= int(self.limit):
+                    wait = None   # until a slot frees up
+                if wait is not None and wait <= 0:
+                    wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                if wait is not None and wait <= 0:
+                    break
+                self._cond.wait(timeout=wait)
+
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self._in_flight += 1
+            self._stats["waitSec"] += time.monotonic() - started
+
+    def _release(self, ok: bool, throttled: bool = False, refund: int = 0):
+        with self._cond:
+            self._in_flight -= 1
+            self.tokens.adjust(refund)   # failed attempt: its tokens/min reservation was never used
+            if self.max_in_flight:
+                if throttled:
+                    self.limit = max(1.0, self.limit / 2)
+                elif ok:
+                    self.limit = min(float(self.max_in_flight), self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the tokens/min bucket once the real usage is known."""
+        if actual is None:
+            return
+        with self._cond:
+            self.tokens.adjust(estimated - actual)
+            self._cond.notify_all()
+
+    # -----------------------------
+    # Call with retries
+    # -----------------------------
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            self._acquire(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                status = _status_of(e)
+                throttled = status in THROTTLE_STATUS
+                self._release(ok=False, throttled=throttled, refund=tokens)
+
+                if not is_retryable(e) or attempt >= self.cfg.max_retries:
+                    with self._cond:
+                        self._stats["failed"] += 1
+                    raise
+
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+                attempt += 1
+
+                with self._cond:
+                    self._stats["retries"] += 1
+                    self._stats["throttled"] += int(throttled)
+                incr("llm_retries", backend=self.name, status=status or type(e).__name__)
+                log.warning(
+                    "%s call failed (%s), retry %d/%d in %.1fs",
+                    self.name, status or type(e).__name__, attempt, self.cfg.max_retries, delay,
+                )
+
+                if throttled:
+                    self._pause(delay)   # everyone backs off, not just this thread
+                else:
+                    time.sleep(delay)
+                continue
+
+            self._release(ok=True)
+            with self._cond:
+                self._stats["calls"] += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "waitSec": round(self._stats["waitSec"], 3),
+                "inFlight": self._in_flight,
+                "limit": round(self.limit, 2) if self.max_in_flight else None,
+                "maxInFlight": self.max_in_flight or None,
+                "requestsPerMin": self.cfg.requests_per_min,
+                "tokensPerMin": self.cfg.tokens_per_min,
+            }
+
+
+_LOCK = threading.Lock()
+_GOVERNORS: Dict[str, BackendGovernor] = {}
+
+
+def get_governor(backend: str) -> BackendGovernor:
+    with _LOCK:
+        gov = _GOVERNORS.get(backend)
+        if gov is None:
+            gov = _GOVERNORS[backend] = BackendGovernor(backend, get_config().backend(backend))
+        return gov
+
+
+def governor_stats() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        governors = dict(_GOVERNORS)
+    return {name: gov.stats() for name, gov in governors.items()}
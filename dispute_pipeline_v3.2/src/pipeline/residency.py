@@ -0,0 +1,63 @@
+# src/pipeline/residency.py
+"""
+Keep local Ollama models resident.
+
+Ollama loads a model on its first request and unloads it after
+`keep_alive` of idleness, so the first case after a quiet period pays a
+multi-second load — and with a Stage 2 model plus the `gemma3:1b`
+outcome summarizer on a small box, alternating between the two can
+evict one to load the other on every case.
+
+- `warm_models()` loads the configured models up front (empty prompt)
+  with OLLAMA_KEEP_ALIVE_SESSION, e.g. at API / daemon start-up.
+- `should_group()` tells batch mode to run Stage 2 calls first and
+  summary calls after, per group of cases (see arbitration_pipeline
+  `--group-by-model`), so each model is loaded once per group instead of
+  once per case.
+
+Cloud models (openai:...) and the fake backend are skipped.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, Iterable
+
+from pipeline.llm_clients import get_llm, parse_model_name
+from pipeline.logs import get_logger
+
+log = get_logger("residency")
+
+# Warm models at API / daemon start (set OLLAMA_WARMUP=0 to skip)
+WARMUP_ON_START = os.getenv("OLLAMA_WARMUP", "1") != "0"
+
+
+def is_local(model_name: str) -> bool:
+    return parse_model_name(model_name)[0] == "ollama"
+
+
+def warm_models(models: Iterable[str], keep_alive: str | None = None) -> Dict[str, float | str]:
+    """
+    Load every local model once. Returns {model: seconds} (or the error
+    text); a missing Ollama server is logged, not raised.
+    """
+    results: Dict[str, float | str] = {}
+    for model in dict.fromkeys(models):   # de-dupe, keep order
+        if not model or not is_local(model):
+            continue
+        started = time.perf_counter()
+        try:
+            get_llm(model).warm(keep_alive)
+        except Exception as e:
+            log.warning("warmup of %s failed: %s", model, e)
+            results[model] = f"{type(e).__name__}: {e}"
+            continue
+        results[model] = round(time.perf_counter() - started, 3)
+        log.info("model %s resident (warmup %.2fs)", model, results[model])
+    return results
+
+
+def should_group(stage2_model: str, summary_model: str) -> bool:
+    """Two different local models → group calls per model in batch mode."""
+    return stage2_model != summary_model and is_local(stage2_model) and is_local(summary_model)
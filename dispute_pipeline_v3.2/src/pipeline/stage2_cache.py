@@ -0,0 +1,154 @@
+# src/pipeline/stage2_cache.py
+"""
+Content-addressed cache for Stage 2 verdicts (SQLite).
+
+Key = sha256 of:
+- prompt version (manual bump) + hash of the prompt text
+- model name (e.g. "openai:gpt-4o-mini", "gemma3:1b")
+- decoding mode ("free" / "constrained"), so A/B runs don't share verdicts
+- canonicalized case payload (sorted keys, compact separators)
+
+So a case is only re-sent to the model when its facts, the prompt or the
+model actually changed.
+
+Expiry:
+- TTL: entries older than `ttl_seconds` count as a miss (and are deleted)
+- Prompt bump: entries written under another prompt version are purged
+  when the cache is opened
+
+Stats (`stats()`): hits / misses / expired / writes / entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage2_cache (
+    key            TEXT PRIMARY KEY,
+    prompt_version TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    created_at     REAL NOT NULL,
+    raw            TEXT,
+    result         TEXT NOT NULL
+)
+"""
+
+
+def canonical_json(obj: Any) -> str:
+    """Stable JSON text: same data → same bytes, regardless of key order."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def make_cache_key(
+    prompt_version: str, prompt: str, model_name: str, payload: Any, decoding: str = "free"
+) -> str:
+    h = hashlib.sha256()
+    for part in (
+        prompt_version,
+        hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        model_name,
+        decoding,
+        canonical_json(payload),
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class Stage2Cache:
+    def __init__(self, path: Path, prompt_version: str, ttl_seconds: Optional[float] = None):
+        self.path = Path(path)
+        self.prompt_version = prompt_version
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._writes = 0
+
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        # One connection shared by worker threads (guarded by _lock)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            # Prompt-version bump → old verdicts are no longer valid
+            self._conn.execute(
+                "DELETE FROM stage2_cache WHERE prompt_version != ?",
+                (self.prompt_version,),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # Read / write
+    # -----------------------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return {"raw": str | None, "result": dict} or None on miss.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, raw, result FROM stage2_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None:
+                self._misses += 1
+                return None
+
+            created_at, raw, result = row
+            if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM stage2_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._expired += 1
+                self._misses += 1
+                return None
+
+            self._hits += 1
+
+        return {"raw": raw, "result": json.loads(result)}
+
+    def put(self, key: str, model_name: str, result: Dict[str, Any], raw: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage2_cache "
+                "(key, prompt_version, model, created_at, raw, result) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    self.prompt_version,
+                    model_name,
+                    time.time(),
+                    raw,
+                    json.dumps(result, ensure_ascii=False),
+                ),
+            )
+            self._conn.commit()
+            self._writes += 1
+
+    # -----------------------------
+    # Stats / lifecycle
+    # -----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM stage2_cache").fetchone()[0]
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "writes": self._writes,
+                "entries": entries,
+                "hitRate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
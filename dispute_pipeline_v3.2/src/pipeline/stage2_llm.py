@@ -3,22 +3,35 @@
 # Stage 2 — LLM SNAD / Neutral / Insufficient Evidence Classification
 # ----------------------------------------
 
+import hashlib
 import json
+import logging
+import os
 import re
 
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-from pipeline.postprocess import clean_json_output, coerce_to_json
-from langchain_ollama import OllamaLLM
+from pipeline.postprocess import JsonRepairParser
+from pipeline.llm_clients import get_llm, OpenAILLMWrapper  # noqa: F401  (re-export)
+from pipeline.stage2_cache import Stage2Cache, make_cache_key
+from pipeline.stage2_payload import DEFAULT_PAYLOAD_MODE, build_payload, payload_tokens
+from pipeline.windowing import DEFAULT_TOKEN_BUDGET, window_case
+from pipeline.tracing import counter, incr, span
+from pipeline.logs import get_logger, sample_case
+from pipeline.env import load_env
 
+load_env()
 
-from openai import OpenAI
-import os
-from langchain_ollama import OllamaLLM
+log = get_logger("stage2")
 
-from dotenv import load_dotenv
-load_dotenv()
+# Stream the verdict and cancel generation once the JSON object closes
+# (set STAGE2_STREAM=0 to wait for the full completion instead)
+STREAM_STAGE2 = os.getenv("STAGE2_STREAM", "1") != "0"
+
+# Ask the backend for schema-constrained output by default?
+# (per call: stage2_llm_evaluate(..., constrained=True); CLI --constrained)
+CONSTRAIN_STAGE2 = os.getenv("STAGE2_CONSTRAINED", "0") == "1"
 
 
 # -----------------------------------
@@ -28,46 +41,21 @@ def _get_llm(model_name: str):
     """
     If model_name starts with 'openai:', call OpenAI model.
     Otherwise use Ollama local model.
-    """
-
-    if model_name.startswith("openai:"):
-        real_name = model_name.replace("openai:", "")
-        return OpenAILLMWrapper(real_name)
-    else:
-        return OllamaLLM(model=model_name)
-
 
-class OpenAILLMWrapper:
-    def __init__(self, model_name: str):
-        from openai import OpenAI
-        import os
-
-        key = os.getenv("OPENAI_API_KEY")
-        if not key:
-            raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
-
-        self.client = OpenAI(api_key=key)
-        self.model_name = model_name
-
-    def invoke(self, prompt: str) -> str:
-        """
-        Simulate the same interface as OllamaLLM.invoke(prompt),
-        returning ONLY the model's text output.
-        """
-
-        response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=2048,   # 足夠你的 JSON 輸出
-        )
-
-        return response.choices[0].message.content
+    Clients come from the shared registry (pipeline.llm_clients),
+    so repeated calls reuse the same pooled HTTP connections.
+    """
+    return get_llm(model_name)
 
 
 # -------------------------------
 # Stage2 Prompt
 # -------------------------------
+# Bump when the prompt semantics change → invalidates cached verdicts
+# (the cache key also includes a hash of the prompt text and message layout).
+# v3.3: rules moved into a system message, case data into the user message
+STAGE2_PROMPT_VERSION = "v3.3"
+
 STAGE2_PROMPT = """
 You are a Taiwan C2C Arbitration Assistant. Respond **in English only**.
 Follow the policy rules STRICTLY. If the facts do not show a clear SNAD breach, default to **Neutral (SND-502)**.
@@ -134,6 +122,80 @@ If any is missing → must be Neutral(SND-502).
 Respond ONLY with the JSON above.
 """.strip()
 
+# The rules are sent as a fixed system message and the case as the user
+# message, so providers can reuse the evaluated rules prefix across cases
+# (OpenAI prompt caching, Ollama KV cache on a kept-alive model).
+STAGE2_SYSTEM_PROMPT = STAGE2_PROMPT
+
+# Stable id of the system prefix (logs, traces, OpenAI prompt_cache_key)
+STAGE2_PROMPT_FINGERPRINT = hashlib.sha256(
+    f"{STAGE2_PROMPT_VERSION}\n{STAGE2_SYSTEM_PROMPT}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def build_stage2_user_message(payload: str) -> str:
+    return f"Case data:\n{payload}"
+
+
+# What the verdict cache hashes as "the prompt": the system rules plus the
+# user message template, so a change to either (or to the split) is a miss
+STAGE2_CACHE_PROMPT = "\n".join(
+    ("[system]", STAGE2_SYSTEM_PROMPT, "[user]", build_stage2_user_message("{payload}"))
+)
+
+
+# -------------------------------
+# Output schema (constrained decoding)
+# -------------------------------
+SNAD_LABELS = ("SNAD", "Neutral", "Insufficient Evidence")
+
+STAGE2_SCHEMA = {
+    "title": "stage2_verdict",
+    "type": "object",
+    "properties": {
+        "snadResult": {
+            "type": "object",
+            "properties": {
+                "label": {"type": "string", "enum": list(SNAD_LABELS)},
+                "reason": {"type": "string"},
+            },
+            "required": ["label", "reason"],
+            "additionalProperties": False,
+        }
+    },
+    "required": ["snadResult"],
+    "additionalProperties": False,
+}
+
+
+def parse_stage2_json(raw: str, mode: str = "free"):
+    """
+    Parse the model reply: plain json.loads first, the repair parser only
+    as a fallback. Returns (data, repaired?). Every call is counted as
+    stage2_json_parse{mode}, every fallback as stage2_json_repair{mode}.
+    """
+    incr("stage2_json_parse", mode=mode)
+    try:
+        return json.loads(raw), False
+    except ValueError:
+        pass
+
+    incr("stage2_json_repair", mode=mode)
+    parser = JsonRepairParser()
+    parser.feed(raw)
+    return parser.result(), True
+
+
+def json_repair_stats() -> Dict[str, Dict[str, int]]:
+    """{mode: {"parsed": n, "repaired": n}} — how often the fallback ran."""
+    return {
+        mode: {
+            "parsed": counter("stage2_json_parse", mode=mode),
+            "repaired": counter("stage2_json_repair", mode=mode),
+        }
+        for mode in ("constrained", "free")
+    }
+
 
 # -------------------------------
 # Stage 2 LLM Runner
@@ -143,58 +205,100 @@ def stage2_llm_evaluate(
     model_name: str,
     debug_dump_dir: Optional[Path] = None,
     case_id: Optional[str] = None,
+    cache: Optional[Stage2Cache] = None,
+    constrained: Optional[bool] = None,
+    payload_mode: Optional[str] = None,
+    token_budget: Optional[int] = None,
 ) -> Dict[str, Any]:
+    """
+    `constrained=True` asks the backend for output matching STAGE2_SCHEMA
+    (Ollama `format`, OpenAI `response_format`); the JSON repair parser
+    then only runs if the reply still fails to parse.
+    Default (None) follows STAGE2_CONSTRAINED.
+
+    `payload_mode` is "full" (original payload) or "compact" (each fact
+    once, opt-in). Default (None) follows STAGE2_PAYLOAD, else "full".
+
+    With `token_budget` (default STAGE2_TOKEN_BUDGET; 0 = off, see
+    pipeline.windowing) long chats are windowed until the whole payload
+    fits; what was dropped is logged, recorded on the "window" span and,
+    with debug_dump_dir, written to {case_id}_stage2_window.json.
+    """
+    if constrained is None:
+        constrained = CONSTRAIN_STAGE2
+    schema = STAGE2_SCHEMA if constrained else None
+    decoding = "constrained" if constrained else "free"
 
-    # -------------------------------
-    # Build FULL TEXT input for LLM
-    # -------------------------------
+    payload_mode = payload_mode or DEFAULT_PAYLOAD_MODE
 
-    listing = extracted.get("listingSummary") or {}
+    if token_budget is None:
+        token_budget = DEFAULT_TOKEN_BUDGET
 
-    raw_listing_text = (
-        f"Title: {listing.get('title','')}\n"
-        f"Price: {listing.get('price','')}\n"
-        f"Condition: {listing.get('condition','')}\n"
-        f"Attributes: {listing.get('attributes','')}\n"
-        f"Disclosed Flaws: {listing.get('disclosedFlaws','')}\n"
-        f"Notes: {listing.get('notes','')}\n"
-    )
+    with span("window") as rec:
+        windowed, window_report = window_case(
+            extracted, token_budget, measure=lambda case: payload_tokens(case, payload_mode)
+        )
+        rec.update(
+            messages=window_report["messages"],
+            dropped=window_report["dropped"],
+            payloadTokens=window_report["payloadTokens"],
+        )
 
-    # Raw chat text (timeline already formatted as “time | sender: msg”)
-    raw_chat_text = "\n".join(extracted.get("timeline") or [])
-
-    # Raw complaint
-    raw_complaint_text = extracted.get("complaintSummary") or ""
-
-    # FINAL payload = summaries + full text
-    payload = json.dumps(
-        {
-            "listingSummary": listing,
-            "complaintSummary": raw_complaint_text,
-            "highlightedIssues": extracted.get("highlightedIssues"),
-            "timeline": extracted.get("timeline"),
-
-            # NEW: Full original text — this fixes missing SNAD reason
-            "rawListingText": raw_listing_text,
-            "rawChatText": raw_chat_text,
-            "rawComplaintText": raw_complaint_text,
-        },
-        ensure_ascii=False,
-    )
+    if window_report["dropped"]:
+        log.info(
+            "chat windowed: kept %d/%d messages, dropped ranges %s",
+            window_report["kept"], window_report["messages"],
+            [(r["from"], r["to"]) for r in window_report["droppedRanges"]],
+            extra={"caseId": case_id or "-"},
+        )
+        if debug_dump_dir and case_id:
+            debug_dump_dir.mkdir(exist_ok=True, parents=True)
+            (debug_dump_dir / f"{case_id}_stage2_window.json").write_text(
+                json.dumps(window_report, indent=2, ensure_ascii=False), encoding="utf-8"
+            )
+
+    if not window_report["fits"]:
+        log.warning(
+            "stage2 payload still over budget after windowing: %d > %d tokens (highlighted messages are kept)",
+            window_report["payloadTokens"], token_budget,
+            extra={"caseId": case_id or "-"},
+        )
 
-    prompt = f"{STAGE2_PROMPT}\n\n---\nCase data:\n{payload}\n---"
+    with span("stage2_prompt_build", promptFingerprint=STAGE2_PROMPT_FINGERPRINT, payload=payload_mode):
+        case_data = build_payload(windowed, payload_mode)
+        payload = json.dumps(case_data, ensure_ascii=False)
+        prompt = build_stage2_user_message(payload)
+
+    # -------------------------------
+    # Verdict cache (same prompt + model + facts → same verdict)
+    # -------------------------------
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(STAGE2_PROMPT_VERSION, STAGE2_CACHE_PROMPT, model_name, case_data, decoding)
+        hit = cache.get(cache_key)
+        if hit is not None:
+            if debug_dump_dir and case_id and hit.get("raw") is not None:
+                debug_dump_dir.mkdir(exist_ok=True, parents=True)
+                (debug_dump_dir / f"{case_id}_stage2_raw.txt").write_text(hit["raw"], encoding="utf-8")
+            return hit["result"]
 
     llm = _get_llm(model_name)
 
     # -------------------------------
     # LLM Call
     # -------------------------------
-    raw = llm.invoke(prompt)
+    invoke_json = getattr(llm, "invoke_json", None) if STREAM_STAGE2 else None
+    call = invoke_json if invoke_json is not None else llm.invoke
+    raw = call(
+        prompt,
+        schema=schema,
+        system=STAGE2_SYSTEM_PROMPT,
+        cache_key=f"stage2-{STAGE2_PROMPT_FINGERPRINT}",
+    )
 
-    # DEBUG: print raw LLM output
-    print("\n================ RAW LLM OUTPUT ================\n")
-    print(raw)
-    print("\n================================================\n")
+    # Raw output is large → DEBUG only, and only for sampled cases
+    if log.isEnabledFor(logging.DEBUG) and sample_case(case_id):
+        log.debug("raw stage2 output (%d chars):\n%s", len(raw), raw, extra={"caseId": case_id or "-"})
 
 
     # Debug dump
@@ -206,16 +310,10 @@ def stage2_llm_evaluate(
     # -------------------------------
     # Try parsing JSON
     # -------------------------------
-    cleaned = clean_json_output(raw)
-
-    try:
-        data = json.loads(cleaned)
-    except Exception:
-        # attempt recovery
-        fixed = coerce_to_json(cleaned)
-        data = json.loads(fixed)
+    with span("json_repair"):
+        data, repaired = parse_stage2_json(raw, mode=decoding)
 
-        if debug_dump_dir and case_id:
+        if repaired and debug_dump_dir and case_id:
             (debug_dump_dir / f"{case_id}_stage2_fixed.json").write_text(
                 json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
             )
@@ -247,4 +345,10 @@ def stage2_llm_evaluate(
     if final_snad["reason"] == "":
         final_snad["reason"] = "No reason provided by the model."
 
-    return {"snadResult": final_snad}
+    result = {"snadResult": final_snad}
+    log.info("stage2 verdict=%s model=%s", final_snad["label"], model_name, extra={"caseId": case_id or "-"})
+
+    if cache is not None:
+        cache.put(cache_key, model_name, result, raw=raw)
+
+    return result
@@ -0,0 +1,111 @@
+# src/pipeline/stage2_payload.py
+"""
+Stage 2 case payload builders.
+
+- "full"    → the original v3.2 payload: structured summaries PLUS the
+              same facts again as raw text (listing ×2, chat ×2,
+              complaint ×2). Still the default.
+- "compact" → every fact once, as plain text. Opt-in (--payload compact /
+              STAGE2_PAYLOAD=compact) until bench/ab_stage2_payload.py
+              shows the verdicts agree with "full".
+
+Both take the (possibly windowed, see pipeline.windowing) extracted case.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict
+
+from pipeline.windowing import estimate_tokens, highlighted_lines
+
+PAYLOAD_MODES = ("compact", "full")
+
+DEFAULT_PAYLOAD_MODE = os.getenv("STAGE2_PAYLOAD", "full")
+
+HIGHLIGHT_MARK = "[HIGHLIGHTED] "
+
+
+# -------------------------------
+# Full (original) payload
+# -------------------------------
+def build_full_payload(extracted: Dict[str, Any]) -> Dict[str, Any]:
+
+    # -------------------------------
+    # Build FULL TEXT input for LLM
+    # -------------------------------
+
+    listing = extracted.get("listingSummary") or {}
+
+    raw_listing_text = (
+        f"Title: {listing.get('title','')}\n"
+        f"Price: {listing.get('price','')}\n"
+        f"Condition: {listing.get('condition','')}\n"
+        f"Attributes: {listing.get('attributes','')}\n"
+        f"Disclosed Flaws: {listing.get('disclosedFlaws','')}\n"
+        f"Notes: {listing.get('notes','')}\n"
+    )
+
+    # Raw chat text (timeline already formatted as “time | sender: msg”)
+    raw_chat_text = "\n".join(extracted.get("timeline") or [])
+
+    # Raw complaint
+    raw_complaint_text = extracted.get("complaintSummary") or ""
+
+    # FINAL payload = summaries + full text
+    return {
+        "listingSummary": listing,
+        "complaintSummary": raw_complaint_text,
+        "highlightedIssues": extracted.get("highlightedIssues"),
+        "timeline": extracted.get("timeline"),
+
+        # NEW: Full original text — this fixes missing SNAD reason
+        "rawListingText": raw_listing_text,
+        "rawChatText": raw_chat_text,
+        "rawComplaintText": raw_complaint_text,
+    }
+
+
+# -------------------------------
+# Compact payload
+# -------------------------------
+def _listing_text(listing: Dict[str, Any]) -> str:
+    lines = []
+    for k, v in listing.items():
+        if k == "photos" and isinstance(v, list):
+            # URLs carry no facts for the model; labels do
+            labels = [p.get("label") for p in v if isinstance(p, dict) and p.get("label")]
+            v = ", ".join(labels)
+        if v in (None, "", [], {}):
+            continue
+        lines.append(f"{k}: {v}")
+    return "\n".join(lines)
+
+
+def build_compact_payload(extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Listing, complaint and chat — each once. Highlighted messages are
+    marked inline instead of being repeated in a separate list.
+    """
+    highlighted = highlighted_lines(extracted)
+    timeline = extracted.get("timeline") or []
+
+    return {
+        "listing": _listing_text(extracted.get("listingSummary") or {}),
+        "complaint": extracted.get("complaintSummary") or "",
+        "chat": "\n".join(HIGHLIGHT_MARK + t if t in highlighted else t for t in timeline),
+    }
+
+
+def build_payload(extracted: Dict[str, Any], mode: str = DEFAULT_PAYLOAD_MODE) -> Dict[str, Any]:
+    if mode == "full":
+        return build_full_payload(extracted)
+    if mode == "compact":
+        return build_compact_payload(extracted)
+    raise ValueError(f"Unknown Stage 2 payload mode: {mode!r} (expected one of {PAYLOAD_MODES})")
+
+
+def payload_tokens(extracted: Dict[str, Any], mode: str = DEFAULT_PAYLOAD_MODE) -> int:
+    """Estimated tokens of the payload as sent (JSON text)."""
+    return estimate_tokens(json.dumps(build_payload(extracted, mode), ensure_ascii=False))
@@ -19,6 +19,9 @@ from pipeline.outcome_ai import ai_summarize_outcome
 # Regex 用來從 reason 抓引號內容
 _Q = re.compile(r'"([^"]+)"')
 
+# Marker: outcome was not computed by the caller → summarize here
+OUTCOME_NOT_COMPUTED = object()
+
 
 # -----------------------------
 # Extract order ID
@@ -82,10 +85,32 @@ def summarize_rec_option(opt: dict, prefix: str) -> str:
     return f"{prefix}) {label}"
 
 
+# -----------------------------
+# Read back the Outcome line
+# -----------------------------
+def extract_outcome(case_summary: str) -> Optional[str]:
+    """Outcome sentence from a built caseSummary, or None (A/B fallback shown)."""
+    for line in (case_summary or "").splitlines():
+        if line.startswith("Outcome: "):
+            return line[len("Outcome: "):].strip() or None
+    return None
+
+
 # -----------------------------
 # Build final case summary
 # -----------------------------
-def build_case_summary(extracted: dict, stage2: dict, eligibility_notes: str, model_name: str) -> str:
+def build_case_summary(
+    extracted: dict,
+    stage2: dict,
+    eligibility_notes: str,
+    model_name: str,
+    outcome=OUTCOME_NOT_COMPUTED,
+) -> str:
+    """
+    `outcome` may be passed in when the caller already ran
+    ai_summarize_outcome (e.g. concurrently with Stage 2); the
+    LLM is then not called again here.
+    """
 
     # Basic fields
     order_id = extract_order_id(extracted.get("orderMeta"))
@@ -102,8 +127,9 @@ def build_case_summary(extracted: dict, stage2: dict, eligibility_notes: str, mo
     b_line = summarize_rec_option(rec.get("alternativeOption", {}), "B")
 
     # Try to summarize final outcome using AI
-    timeline = extracted.get("timeline") or []
-    outcome = ai_summarize_outcome(timeline, model_name)
+    if outcome is OUTCOME_NOT_COMPUTED:
+        timeline = extracted.get("timeline") or []
+        outcome = ai_summarize_outcome(timeline, model_name)
 
     # -----------------------------
     # Build final text block
@@ -18,6 +18,8 @@ Return format:
               "conversation_exceeds_72h" / "manual_escalation" / None
 }
 
+For wall-clock triggering of silent chats see pipeline/trigger_service.py.
+
 Assumptions:
 - chat_log is a list of messages with fields:
     {
@@ -30,16 +32,19 @@ Assumptions:
 
 from __future__ import annotations
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
 
 # ---------------------------
 # 🔧 Helper — parse timestamp
 # ---------------------------
+@lru_cache(maxsize=65536)
 def _parse_time(ts: str) -> datetime:
     """
     Convert timestamp string into datetime.
     Supports formats like: '2025-10-08 10:23'
+    (cached: the same chat is re-checked on every new message)
     """
     return datetime.strptime(ts, "%Y-%m-%d %H:%M")
 
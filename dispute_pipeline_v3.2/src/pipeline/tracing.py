@@ -0,0 +1,264 @@
+# src/pipeline/tracing.py
+"""
+Lightweight per-stage timing + token instrumentation.
+
+- `span(name, **attrs)`   → time a block; nested spans are allowed
+- `record_llm_usage(...)` → attach prompt / completion token counts to
+                            the current span (and global counters)
+- `trace_case(case_id)`   → group all spans of one case into a trace
+                            (the CLI writes them with `--trace-file`)
+- `incr(name, **labels)`  → plain event counter (e.g. stage2_json_repair)
+
+Span names used by the pipeline:
+    extract, stage2_prompt_build, llm_call, json_repair (parsing the
+    model reply), stage2_postprocess (cleaning the parsed verdict),
+    policy_anchors, outcome_summary, file_write
+
+Every span also feeds process-wide aggregates, exposed in Prometheus
+text format by `prometheus_text()` (served at GET /metrics).
+
+Context is carried in contextvars, so spans opened inside
+`asyncio.to_thread(...)` still land in the right case trace.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Histogram buckets (seconds) for span durations
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# -----------------------------
+# Per-case trace
+# -----------------------------
+class Trace:
+    def __init__(self, case_id: Optional[str]):
+        self.case_id = case_id
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(record)
+
+    def offset(self, t: float) -> float:
+        return round((t - self._t0) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["startMs"])
+        return {"caseId": self.case_id, "startedAt": self.started_at, "spans": spans}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("span", default=None)
+
+_collect_lock = threading.Lock()
+_collect = False
+_finished: List[Dict[str, Any]] = []
+
+
+def collect_traces(enabled: bool = True):
+    """Keep finished case traces in memory (CLI --trace-file). Off by default."""
+    global _collect
+    _collect = enabled
+
+
+def finished_traces() -> List[Dict[str, Any]]:
+    with _collect_lock:
+        return list(_finished)
+
+
+@contextmanager
+def trace_case(case_id: Optional[str]):
+    """Open a trace for one case; re-uses the current one if already inside a trace."""
+    if _current_trace.get() is not None:
+        yield _current_trace.get()
+        return
+
+    trace = Trace(case_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if _collect:
+            with _collect_lock:
+                _finished.append(trace.to_dict())
+
+
+# -----------------------------
+# Aggregates (Prometheus)
+# -----------------------------
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, v: float):
+        self.n += 1
+        self.total += v
+        for i, b in enumerate(BUCKETS):
+            if v <= b:
+                self.counts[i] += 1
+
+
+_agg_lock = threading.Lock()
+_span_hist: Dict[str, _Histogram] = {}
+_span_errors: Dict[str, int] = {}
+_tokens: Dict[tuple, int] = {}   # (model, "prompt" | "completion") → count
+_llm_calls: Dict[str, int] = {}  # model → calls
+_counters: Dict[tuple, int] = {}  # (name, ((label, value), ...)) → count
+
+
+def _observe(name: str, seconds: float, failed: bool):
+    with _agg_lock:
+        _span_hist.setdefault(name, _Histogram()).observe(seconds)
+        if failed:
+            _span_errors[name] = _span_errors.get(name, 0) + 1
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+@contextmanager
+def span(name: str, **attrs):
+    record: Dict[str, Any] = {"name": name, **attrs}
+    token = _current_span.set(record)
+    t = time.perf_counter()
+    failed = False
+    try:
+        yield record
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - t
+        _current_span.reset(token)
+        _observe(name, elapsed, failed)
+
+        trace = _current_trace.get()
+        if trace is not None:
+            record["startMs"] = trace.offset(t)
+            record["durationMs"] = round(elapsed * 1000, 3)
+            if failed:
+                record["error"] = True
+            trace.add(record)
+
+
+def record_llm_usage(
+    model: str,
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    cached_tokens: Optional[int] = None,
+):
+    """Attach token counts to the current span and the global counters."""
+    current = _current_span.get()
+    if current is not None:
+        current["promptTokens"] = prompt_tokens
+        current["completionTokens"] = completion_tokens
+        if cached_tokens is not None:
+            current["cachedPromptTokens"] = cached_tokens
+
+    with _agg_lock:
+        _llm_calls[model] = _llm_calls.get(model, 0) + 1
+        if prompt_tokens:
+            _tokens[(model, "prompt")] = _tokens.get((model, "prompt"), 0) + int(prompt_tokens)
+        if completion_tokens:
+            _tokens[(model, "completion")] = _tokens.get((model, "completion"), 0) + int(completion_tokens)
+        if cached_tokens:
+            _tokens[(model, "cached_prompt")] = _tokens.get((model, "cached_prompt"), 0) + int(cached_tokens)
+
+
+def incr(name: str, n: int = 1, **labels):
+    """Bump a named counter, exported as pipeline_<name>_total."""
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _agg_lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def counter(name: str, **labels) -> int:
+    """Sum of a counter over all label sets matching `labels`."""
+    want = {(k, str(v)) for k, v in labels.items()}
+    with _agg_lock:
+        return sum(n for (c, lbl), n in _counters.items() if c == name and want <= set(lbl))
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Prometheus text exposition (format 0.0.4)."""
+    lines: List[str] = []
+    with _agg_lock:
+        lines.append("# HELP pipeline_span_seconds Duration of pipeline spans.")
+        lines.append("# TYPE pipeline_span_seconds histogram")
+        for name, h in sorted(_span_hist.items()):
+            label = f'span="{_esc(name)}"'
+            for b, c in zip(BUCKETS, h.counts):
+                lines.append(f'pipeline_span_seconds_bucket{{{label},le="{b}"}} {c}')
+            lines.append(f'pipeline_span_seconds_bucket{{{label},le="+Inf"}} {h.n}')
+            lines.append(f"pipeline_span_seconds_sum{{{label}}} {h.total:.6f}")
+            lines.append(f"pipeline_span_seconds_count{{{label}}} {h.n}")
+
+        lines.append("# HELP pipeline_span_errors_total Spans that raised.")
+        lines.append("# TYPE pipeline_span_errors_total counter")
+        for name, n in sorted(_span_errors.items()):
+            lines.append(f'pipeline_span_errors_total{{span="{_esc(name)}"}} {n}')
+
+        lines.append("# HELP pipeline_llm_calls_total LLM calls per model.")
+        lines.append("# TYPE pipeline_llm_calls_total counter")
+        for model, n in sorted(_llm_calls.items()):
+            lines.append(f'pipeline_llm_calls_total{{model="{_esc(model)}"}} {n}')
+
+        lines.append("# HELP pipeline_llm_tokens_total LLM tokens per model and kind.")
+        lines.append("# TYPE pipeline_llm_tokens_total counter")
+        for (model, kind), n in sorted(_tokens.items()):
+            lines.append(f'pipeline_llm_tokens_total{{model="{_esc(model)}",kind="{kind}"}} {n}')
+
+        typed = set()
+        for (name, labels), n in sorted(_counters.items()):
+            metric = f"pipeline_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label = ",".join(f'{k}="{_esc(v)}"' for k, v in labels)
+            lines.append(f"{metric}{{{label}}} {n}" if label else f"{metric} {n}")
+
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> Dict[str, Any]:
+    """Aggregates as plain JSON (written next to the traces)."""
+    with _agg_lock:
+        return {
+            "spans": {
+                name: {
+                    "count": h.n,
+                    "totalMs": round(h.total * 1000, 3),
+                    "meanMs": round(h.total * 1000 / h.n, 3) if h.n else 0.0,
+                    "errors": _span_errors.get(name, 0),
+                }
+                for name, h in sorted(_span_hist.items())
+            },
+            "llmCalls": dict(_llm_calls),
+            "tokens": {f"{m}:{k}": n for (m, k), n in sorted(_tokens.items())},
+            "counters": {
+                name + "".join(f",{k}={v}" for k, v in labels): n
+                for (name, labels), n in sorted(_counters.items())
+            },
+        }
@@ -0,0 +1,137 @@
+# src/pipeline/trigger_batch.py
+"""
+Batch version of summary_trigger.check_summary_trigger for the periodic
+sweep over all open disputes.
+
+Input is columnar — one row per chat message:
+
+    case_ids   ["case1", "case1", "case2", ...]
+    senders    ["Buyer", "Seller", "Buyer", ...]
+    timestamps ["2025-10-05 11:58", ...]
+
+Timestamps are parsed in one go into int64 epoch seconds and the
+per-case first / last-buyer / last-seller times are NumPy group-by
+reductions, so there is no Python loop per message (or per case).
+
+Same rules and priority as check_summary_trigger:
+buyer_inactive_24h > seller_inactive_24h > conversation_exceeds_72h.
+"now" is each case's last message (like check_summary_trigger) unless
+`now` is given — then it is the same wall clock for every case.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+INACTIVITY_SECONDS = 24 * 3600
+CONVERSATION_SECONDS = 72 * 3600
+
+REASONS = ("buyer_inactive_24h", "seller_inactive_24h", "conversation_exceeds_72h")
+
+_NONE = np.iinfo(np.int64).min   # "no message from this sender"
+
+
+def parse_timestamps(timestamps: Sequence[str]) -> np.ndarray:
+    """'2025-10-08 10:23' strings → int64 epoch seconds (naive clock)."""
+    try:
+        return np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        pass
+
+    # Slow path: at least one bad string → parse one by one, bad rows = NaT
+    out = np.empty(len(timestamps), dtype="datetime64[s]")
+    for i, ts in enumerate(timestamps):
+        try:
+            out[i] = np.datetime64(ts, "s")
+        except ValueError:
+            out[i] = np.datetime64("NaT")
+    return out.astype(np.int64)
+
+
+def _group_index(case_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    np.unique(case_ids, return_inverse=True), but only the first row of
+    each run of equal ids is sorted — a table ordered by case (the usual
+    dump) costs one string sort per case instead of per message.
+    """
+    starts = np.flatnonzero(np.r_[True, case_ids[1:] != case_ids[:-1]])
+    cases, head_inv = np.unique(case_ids[starts], return_inverse=True)
+    run_lengths = np.diff(np.r_[starts, len(case_ids)])
+    return cases, np.repeat(head_inv, run_lengths)
+
+
+def _epoch(now: Union[str, datetime, int, float]) -> int:
+    if isinstance(now, (int, float)) and not isinstance(now, bool):
+        return int(now)
+    return int(np.datetime64(now, "s").astype(np.int64))
+
+
+def check_summary_triggers_batch(
+    case_ids: Sequence[str],
+    senders: Sequence[str],
+    timestamps: Sequence[str],
+    now: Optional[Union[str, datetime, int, float]] = None,
+) -> Dict[str, str]:
+    """
+    Returns {case_id: reason} for every case that triggers.
+
+    now: None → per-case last message time (check_summary_trigger
+    behaviour); else a chat-clock timestamp / naive datetime / epoch.
+    """
+    case_ids = np.asarray(case_ids)
+    senders = np.asarray(senders)
+    if not (len(case_ids) == len(senders) == len(timestamps)):
+        raise ValueError("case_ids, senders and timestamps must have the same length")
+    if len(case_ids) == 0:
+        return {}
+
+    ts = parse_timestamps(timestamps)
+    valid = ts != np.datetime64("NaT").astype(np.int64)
+    if not valid.all():
+        case_ids, senders, ts = case_ids[valid], senders[valid], ts[valid]
+        if len(case_ids) == 0:
+            return {}
+
+    # group-by: case index per row
+    cases, inv = _group_index(case_ids)
+    n = len(cases)
+
+    first = np.full(n, np.iinfo(np.int64).max)
+    latest = np.full(n, _NONE)
+    np.minimum.at(first, inv, ts)
+    np.maximum.at(latest, inv, ts)
+
+    buyer_last = np.full(n, _NONE)
+    seller_last = np.full(n, _NONE)
+    is_buyer = senders == "Buyer"
+    is_seller = senders == "Seller"
+    np.maximum.at(buyer_last, inv[is_buyer], ts[is_buyer])
+    np.maximum.at(seller_last, inv[is_seller], ts[is_seller])
+
+    ref = latest if now is None else np.full(n, _epoch(now))
+
+    buyer = (buyer_last != _NONE) & (ref - buyer_last >= INACTIVITY_SECONDS)
+    seller = (seller_last != _NONE) & (ref - seller_last >= INACTIVITY_SECONDS)
+    long_conv = ref - first >= CONVERSATION_SECONDS
+
+    # first matching rule wins; 3 = no trigger
+    reason_idx = np.select([buyer, seller, long_conv], [0, 1, 2], default=3)
+    hit = np.nonzero(reason_idx < 3)[0]
+    return {str(cases[i]): REASONS[reason_idx[i]] for i in hit}
+
+
+def chat_columns(chats: Mapping[str, List[Dict[str, Any]]]) -> Tuple[List[str], List[str], List[str]]:
+    """{case_id: chatLog} → (case_ids, senders, timestamps) columns."""
+    case_ids: List[str] = []
+    senders: List[str] = []
+    timestamps: List[str] = []
+    for case_id, chat_log in chats.items():
+        for m in chat_log or []:
+            if isinstance(m, dict) and m.get("timestamp"):
+                case_ids.append(case_id)
+                senders.append(m.get("sender") or "")
+                timestamps.append(m["timestamp"])
+    return case_ids, senders, timestamps
@@ -0,0 +1,224 @@
+# src/pipeline/trigger_service.py
+"""
+Event-driven summary trigger service (wall-clock version of
+summary_trigger.check_summary_trigger).
+
+check_summary_trigger only compares timestamps INSIDE the chat, so a
+silent chat never fires. This service keeps, per open case, the next
+deadline for each rule and fires on real time:
+
+    buyer_inactive_24h        last Buyer message  + 24h
+    seller_inactive_24h       last Seller message + 24h
+    conversation_exceeds_72h  first message       + 72h
+
+Deadlines live in ONE min-heap shared by all cases, so the cost is
+O(log n) per message / per firing and nothing polls idle chats.
+Updated deadlines push a new heap entry; the superseded one is skipped
+when popped (lazy deletion) and the heap is compacted when stale
+entries pile up.
+
+Each rule fires once per arming: a new Buyer (Seller) message re-arms
+the buyer (seller) rule; the 72h rule fires once per case.
+
+Chat timestamps ("2025-10-08 10:23") are naive → read as local time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+INACTIVITY_SECONDS = 24 * 3600
+CONVERSATION_SECONDS = 72 * 3600
+
+BUYER_INACTIVE = "buyer_inactive_24h"
+SELLER_INACTIVE = "seller_inactive_24h"
+CONVERSATION_LONG = "conversation_exceeds_72h"
+
+_SENDER_RULE = {"Buyer": BUYER_INACTIVE, "Seller": SELLER_INACTIVE}
+
+
+def parse_chat_time(ts: str) -> float:
+    """'2025-10-08 10:23' → epoch seconds (local time)."""
+    # Fast path for the fixed chat format; strptime for anything else
+    try:
+        dt = datetime(int(ts[0:4]), int(ts[5:7]), int(ts[8:10]), int(ts[11:13]), int(ts[14:16]))
+    except (ValueError, IndexError, TypeError):
+        dt = datetime.strptime(ts, "%Y-%m-%d %H:%M")
+    return dt.timestamp()
+
+
+class _CaseState:
+    __slots__ = ("first", "deadlines")
+
+    def __init__(self):
+        self.first: Optional[float] = None
+        # reason → armed deadline (removed once fired)
+        self.deadlines: Dict[str, float] = {}
+
+
+class TriggerService:
+    """
+    `on_fire(case_id, reason)` is called for every deadline that passes.
+    Feed it messages with `observe()`; drop resolved cases with `close()`.
+    Run `run_due()` yourself or `await run()` as a background task.
+    """
+
+    def __init__(
+        self,
+        on_fire: Callable[[str, str], Any],
+        clock: Callable[[], float] = time.time,
+    ):
+        self.on_fire = on_fire
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cases: Dict[str, _CaseState] = {}
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._live = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fired = 0
+
+    # -----------------------------
+    # Feeding
+    # -----------------------------
+    def _arm(self, case_id: str, state: _CaseState, reason: str, deadline: float) -> bool:
+        prev = state.deadlines.get(reason)
+        if prev is None:
+            self._live += 1
+        elif prev == deadline:
+            return False
+        state.deadlines[reason] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), case_id, reason))
+        return self._heap[0][0] == deadline
+
+    def observe(self, case_id: str, messages: Iterable[Dict[str, Any]], arm_past: bool = True):
+        """
+        Register new chat messages (in chronological order) for a case.
+        arm_past=False → deadlines already in the past are not armed
+        (used when seeding old cases on startup).
+        """
+        earliest_changed = False
+        now = None if arm_past else self.clock()
+        with self._lock:
+            state = self._cases.get(case_id)
+            if state is None:
+                state = self._cases[case_id] = _CaseState()
+
+            for msg in messages:
+                ts = msg.get("timestamp") if isinstance(msg, dict) else None
+                if not ts:
+                    continue
+                try:
+                    t = parse_chat_time(ts)
+                except ValueError:
+                    continue
+
+                arm = []
+                if state.first is None:
+                    state.first = t
+                    arm.append((CONVERSATION_LONG, t + CONVERSATION_SECONDS))
+                rule = _SENDER_RULE.get(msg.get("sender"))
+                if rule is not None:
+                    arm.append((rule, t + INACTIVITY_SECONDS))
+
+                for reason, deadline in arm:
+                    if now is not None and deadline <= now:
+                        # superseded by a later message or just not wanted
+                        if state.deadlines.pop(reason, None) is not None:
+                            self._live -= 1
+                        continue
+                    earliest_changed |= self._arm(case_id, state, reason, deadline)
+
+        if earliest_changed:
+            self._wake()
+
+    def close(self, case_id: str):
+        """Case resolved → forget it (its heap entries become stale)."""
+        with self._lock:
+            state = self._cases.pop(case_id, None)
+            if state is not None:
+                self._live -= len(state.deadlines)
+                self._maybe_compact()
+
+    # -----------------------------
+    # Firing
+    # -----------------------------
+    def _maybe_compact(self):
+        # Rebuild when more than half of the heap is stale
+        if len(self._heap) > 1024 and len(self._heap) > 2 * self._live:
+            self._heap = [
+                e for e in self._heap
+                if (s := self._cases.get(e[2])) is not None and s.deadlines.get(e[3]) == e[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        with self._lock:
+            while self._heap:
+                deadline, _, case_id, reason = self._heap[0]
+                state = self._cases.get(case_id)
+                if state is not None and state.deadlines.get(reason) == deadline:
+                    return deadline
+                heapq.heappop(self._heap)   # stale
+        return None
+
+    def run_due(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Fire every deadline <= now. Returns [(case_id, reason), ...]."""
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, case_id, reason = heapq.heappop(self._heap)
+                state = self._cases.get(case_id)
+                if state is None or state.deadlines.get(reason) != deadline:
+                    continue   # stale
+                del state.deadlines[reason]
+                self._live -= 1
+                due.append((case_id, reason))
+            self._maybe_compact()
+
+        for case_id, reason in due:
+            self.fired += 1
+            self.on_fire(case_id, reason)
+        return due
+
+    # -----------------------------
+    # Background loop
+    # -----------------------------
+    def _wake(self):
+        if self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, max_sleep: float = 3600.0):
+        """Sleep until the next deadline (or an earlier one is added), fire, repeat."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self.run_due()
+                nxt = self.next_deadline()
+                timeout = max_sleep if nxt is None else min(max_sleep, max(0.0, nxt - self.clock()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+            self._loop = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "openCases": len(self._cases),
+                "armedDeadlines": self._live,
+                "heapEntries": len(self._heap),
+                "fired": self.fired,
+            }
@@ -0,0 +1,201 @@
+# src/pipeline/windowing.py
+"""
+Chat-log windowing between Stage 1 and Stage 2.
+
+Long disputes (hundreds of messages) overflow the context of small local
+models, or just make Stage 2 slow. `window_case()` returns a copy of the
+extracted case whose Stage 2 payload fits a token budget, plus a report
+of what was dropped. The original `extracted` is not modified (Stage 3
+and the analysis output still see the full chat).
+
+Off by default: set STAGE2_TOKEN_BUDGET (e.g. 3000) to enable it. The
+budget covers the whole payload as built by pipeline.stage2_payload
+(`measure`), so the "full" payload — which carries the chat twice plus
+the highlighted issues and raw fields — is held to it as well.
+
+What is kept, in priority order:
+1) highlighted messages (`highlight: true`) — always
+2) the opening messages about the listing (before "Order created"),
+   up to ~1/3 of the remaining budget
+3) the final exchanges, with whatever budget is left
+
+Each dropped stretch is replaced by one summary line, e.g.
+    ... [14 messages omitted: 2025-10-05 12:16 → 2025-10-06 10:15; Buyer 7, Seller 6, System 1] ...
+
+Tokens are estimated as len(text) / 4.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Whole Stage 2 payload budget in tokens; 0 = no windowing
+DEFAULT_TOKEN_BUDGET = int(os.getenv("STAGE2_TOKEN_BUDGET", "0"))
+
+CHARS_PER_TOKEN = 4
+
+_ORDER_CREATED = re.compile(r"\|\s*System:\s*Order created", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _split_line(line: str) -> Tuple[str, str]:
+    """'2025-10-05 11:58 | Buyer: Hi' → ('2025-10-05 11:58', 'Buyer')"""
+    ts, _, rest = line.partition(" | ")
+    sender = rest.partition(":")[0].strip() if rest else ""
+    return ts.strip(), sender or "?"
+
+
+def _gap_line(dropped: List[str]) -> str:
+    first, _ = _split_line(dropped[0])
+    last, _ = _split_line(dropped[-1])
+    senders = Counter(_split_line(line)[1] for line in dropped)
+    who = ", ".join(f"{s} {n}" for s, n in senders.most_common())
+    return f"... [{len(dropped)} messages omitted: {first} → {last}; {who}] ..."
+
+
+def highlighted_lines(extracted: Dict[str, Any]) -> set:
+    return {
+        f"{m.get('timestamp')} | {m.get('sender')}: {m.get('text')}"
+        for m in extracted.get("highlightedIssues") or []
+        if isinstance(m, dict)
+    }
+
+
+def window_timeline(
+    lines: List[str],
+    keep: set,
+    budget_tokens: int,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Fit `lines` into `budget_tokens`. Indexes in `keep` are never dropped.
+    Returns (windowed lines, dropped ranges [{"from", "to", "count"}]).
+    """
+    budget = budget_tokens * CHARS_PER_TOKEN
+    cost = [len(line) + 1 for line in lines]
+    if sum(cost) <= budget:
+        return list(lines), []
+
+    chosen = set(keep)
+    remaining = budget - sum(cost[i] for i in chosen)
+
+    # opening: the listing discussion, i.e. everything before the order
+    head_end = next((i for i, line in enumerate(lines) if _ORDER_CREATED.search(line)), len(lines))
+    head_budget = remaining // 3
+    i = 0
+    while i < head_end and (i in chosen or cost[i] <= head_budget):
+        if i not in chosen:
+            head_budget -= cost[i]
+            remaining -= cost[i]
+            chosen.add(i)
+        i += 1
+
+    # final exchanges: the rest of the budget, from the end backwards
+    j = len(lines) - 1
+    while j >= i and (j in chosen or cost[j] <= remaining):
+        if j not in chosen:
+            remaining -= cost[j]
+            chosen.add(j)
+        j -= 1
+
+    out: List[str] = []
+    dropped_ranges: List[Dict[str, Any]] = []
+    gap: List[str] = []
+    gap_start = 0
+    for idx, line in enumerate(lines + [None]):
+        if idx < len(lines) and idx not in chosen:
+            if not gap:
+                gap_start = idx
+            gap.append(line)
+            continue
+        if gap:
+            out.append(_gap_line(gap))
+            dropped_ranges.append({"from": gap_start, "to": idx - 1, "count": len(gap)})
+            gap = []
+        if line is not None:
+            out.append(line)
+
+    return out, dropped_ranges
+
+
+def _chat_tokens(extracted: Dict[str, Any]) -> int:
+    """Default measure: listing + complaint + chat text."""
+    return (
+        estimate_tokens(extracted.get("rawListingText") or "")
+        + estimate_tokens(extracted.get("complaintSummary") or "")
+        + estimate_tokens("\n".join(extracted.get("timeline") or []))
+    )
+
+
+def _with_timeline(extracted: Dict[str, Any], lines: List[str]) -> Dict[str, Any]:
+    out = dict(extracted)
+    out["timeline"] = lines
+    out["rawChatText"] = "\n".join(lines)
+    return out
+
+
+def window_case(
+    extracted: Dict[str, Any],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    measure: Optional[Callable[[Dict[str, Any]], int]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Return (windowed copy of `extracted`, report). `measure(case)` gives
+    the tokens of the payload built from a case; the chat gets whatever
+    the rest of that payload leaves of `token_budget`. A budget of 0
+    (or less) turns windowing off.
+
+    Highlighted messages are never dropped, so if they alone exceed the
+    budget the result is still over it (report["fits"] is False).
+    """
+    measure = measure or _chat_tokens
+    timeline = extracted.get("timeline") or []
+    report = {
+        "tokenBudget": token_budget,
+        "messages": len(timeline),
+        "kept": len(timeline),
+        "dropped": 0,
+        "droppedRanges": [],
+        "payloadTokens": None,     # not measured when windowing is off
+        "fits": True,
+    }
+    if token_budget <= 0:
+        return extracted, report
+
+    total = measure(extracted)
+    report["payloadTokens"] = total
+    if total <= token_budget:
+        return extracted, report
+
+    # The payload may carry the chat more than once ("full": timeline + rawChatText)
+    overhead = measure(_with_timeline(extracted, []))
+    chat_tokens = max(1, estimate_tokens("\n".join(timeline)))
+    copies = max(1, round((total - overhead) / chat_tokens))
+
+    highlighted = highlighted_lines(extracted)
+    keep = {i for i, line in enumerate(timeline) if line in highlighted}
+
+    chat_budget = max(0, (token_budget - overhead) // copies)
+    while True:
+        windowed, dropped = window_timeline(timeline, keep, chat_budget)
+        out = _with_timeline(extracted, windowed)
+        total = measure(out)
+        # gap lines and JSON escaping are not in the line costs → shrink and retry
+        if total <= token_budget or chat_budget == 0:
+            break
+        chat_budget = max(0, chat_budget - max(1, (total - token_budget) // copies))
+
+    report.update(
+        chatBudget=chat_budget,
+        kept=len(timeline) - sum(r["count"] for r in dropped),
+        dropped=sum(r["count"] for r in dropped),
+        droppedRanges=dropped,
+        payloadTokens=total,
+        fits=total <= token_budget,
+    )
+    return (out if dropped else extracted), report
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# src/pipeline_daemon.py
+# -*- coding: utf-8 -*-
+
+"""
+Warm pipeline process on a Unix socket + thin client.
+
+Schedulers that run `python arbitration_pipeline.py --case-id X` once
+per case pay interpreter start-up, imports, .env loading and LLM client
+construction every time. Instead:
+
+    python src/pipeline_daemon.py serve &                 # once
+    python src/pipeline_daemon.py run --case-id case1     # per case
+    python src/pipeline_daemon.py chatbot --case-id case1
+    python src/pipeline_daemon.py stats
+    python src/pipeline_daemon.py shutdown
+
+The server keeps the pipeline imported, one Stage 2 verdict cache and
+the pooled LLM clients for its whole lifetime, and loads the local
+models at start (pipeline.residency). The client only imports
+the standard library.
+
+Protocol: one request per connection, one JSON line each way.
+    → {"cmd": "run", "args": {"caseId": "case1", ...}}
+    ← {"ok": true, "result": {...}}   /   {"ok": false, "error": "..."}
+
+Socket path: --socket, env PIPELINE_SOCKET, default /tmp/dispute-pipeline.sock
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+DEFAULT_SOCKET = os.getenv("PIPELINE_SOCKET", "/tmp/dispute-pipeline.sock")
+
+
+# ======================================================
+# Server
+# ======================================================
+class PipelineServer:
+    def __init__(self, args):
+        # Heavy imports happen here, once per daemon
+        from arbitration_pipeline import run_async
+        from initial_judgement_chatbot import run as chatbot_run
+        from pipeline.stage2_cache import Stage2Cache
+        from pipeline.config import get_config, set_config
+        from pipeline.stage2_llm import STAGE2_PROMPT_VERSION
+
+        if args.config:
+            set_config(args.config)
+        self._stage2_model = get_config().stage2_model
+
+        self.args = args
+        self._run_async = run_async
+        self._chatbot_run = chatbot_run
+        self.stage2_cache = None
+        if not args.no_cache:
+            self.stage2_cache = Stage2Cache(
+                Path(args.cache_db),
+                prompt_version=STAGE2_PROMPT_VERSION,
+                ttl_seconds=args.cache_ttl_hours * 3600,
+            )
+        self.requests = 0
+        self.failed = 0
+
+        if not args.no_warmup:
+            from pipeline.residency import warm_models
+
+            config = get_config()
+            warm_models(args.warm or [config.stage2_model, config.stage3_model])
+
+    async def _cmd_run(self, a: dict) -> dict:
+        out_path = await self._run_async(
+            case_id=a["caseId"],
+            data_dir=Path(a.get("dataDir") or "./data/source"),
+            out_dir=Path(a.get("outDir") or "./data/analysis"),
+            model_name=a.get("model") or self._stage2_model,
+            debug_dump=bool(a.get("debugDump")),
+            stage2_cache=self.stage2_cache,
+            constrained=a.get("constrained"),
+            payload_mode=a.get("payload"),
+            outcome_mode=a.get("outcomeMode"),
+        )
+        return {"caseId": a["caseId"], "analysisPath": str(out_path)}
+
+    async def _cmd_chatbot(self, a: dict) -> dict:
+        import asyncio
+
+        reply = await asyncio.to_thread(
+            self._chatbot_run,
+            a.get("caseId") or "case1",
+            Path(a.get("dataDir") or "./data/source"),
+            a.get("model") or "openai:gpt-4o-mini",
+            a.get("file"),
+        )
+        return {"reply": reply}
+
+    def _cmd_stats(self, a: dict) -> dict:
+        from pipeline.llm_clients import client_stats
+        from pipeline.ratelimit import governor_stats
+
+        return {
+            "pid": os.getpid(),
+            "requests": self.requests,
+            "failed": self.failed,
+            "stage2Cache": self.stage2_cache.stats() if self.stage2_cache else None,
+            "llmClients": client_stats(),
+            "llmLimits": governor_stats(),
+        }
+
+    async def handle(self, req: dict) -> dict:
+        cmd = req.get("cmd")
+        args = req.get("args") or {}
+        if cmd == "run":
+            async with self._slots:
+                return await self._cmd_run(args)
+        if cmd == "chatbot":
+            async with self._slots:
+                return await self._cmd_chatbot(args)
+        if cmd == "stats":
+            return self._cmd_stats(args)
+        if cmd == "shutdown":
+            self._stop.set()
+            return {"stopping": True}
+        raise ValueError(f"Unknown command: {cmd!r}")
+
+    async def _on_connection(self, reader, writer):
+        # One request per connection (connecting to a local socket is cheap)
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            self.requests += 1
+            try:
+                resp = {"ok": True, "result": await self.handle(json.loads(line))}
+            except Exception as e:
+                self.failed += 1
+                resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            writer.write(json.dumps(resp, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str):
+        import asyncio
+        import signal
+
+        self._slots = asyncio.Semaphore(self.args.workers)
+        self._stop = asyncio.Event()
+
+        server = await asyncio.start_unix_server(self._on_connection, path=path)
+        os.chmod(path, 0o600)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop.set)
+
+        print(f"[daemon] pid {os.getpid()} listening on {path}", flush=True)
+        async with server:
+            await self._stop.wait()
+
+    def close(self):
+        from pipeline.llm_clients import shutdown_clients
+
+        if self.stage2_cache is not None:
+            self.stage2_cache.close()
+        shutdown_clients()
+
+
+def _claim_socket(path: str):
+    """Remove a stale socket file; refuse if a daemon is still answering."""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+            return
+    raise SystemExit(f"A pipeline daemon is already listening on {path}")
+
+
+def serve(args):
+    import asyncio
+
+    from pipeline.logs import configure_logging
+
+    configure_logging(level=args.log_level)
+    _claim_socket(args.socket)
+    server = PipelineServer(args)
+    try:
+        asyncio.run(server.serve(args.socket))
+    finally:
+        server.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print("[daemon] stopped", flush=True)
+
+
+# ======================================================
+# Client
+# ======================================================
+def request(path: str, cmd: str, args: dict | None = None, timeout: float | None = None) -> dict:
+    """Send one command to the daemon; returns `result` or raises RuntimeError."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall(json.dumps({"cmd": cmd, "args": args or {}}, ensure_ascii=False).encode("utf-8") + b"\n")
+        line = s.makefile("rb").readline()
+    if not line:
+        raise RuntimeError("Pipeline daemon closed the connection without a reply")
+    resp = json.loads(line)
+    if not resp.get("ok"):
+        raise RuntimeError(resp.get("error") or "unknown error")
+    return resp["result"]
+
+
+def _abs(path: str | None) -> str | None:
+    # Paths are resolved by the client: the daemon's cwd may differ
+    return str(Path(path).resolve()) if path else None
+
+
+def client(args) -> int:
+    if args.cmd == "run":
+        payload = {
+            "caseId": args.case_id,
+            "dataDir": _abs(args.data_dir),
+            "outDir": _abs(args.out_dir),
+            "model": args.model,
+            "debugDump": args.debug_dump,
+            "constrained": args.constrained,
+            "payload": args.payload,
+            "outcomeMode": args.outcome_mode,
+        }
+    elif args.cmd == "chatbot":
+        payload = {
+            "caseId": args.case_id,
+            "dataDir": _abs(args.data_dir),
+            "model": args.model,
+            "file": _abs(args.file),
+        }
+    else:
+        payload = {}
+
+    try:
+        result = request(args.socket, args.cmd, payload, timeout=args.timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No pipeline daemon on {args.socket} (start one with: pipeline_daemon.py serve)", file=sys.stderr)
+        return 2
+    except (socket.timeout, TimeoutError):
+        print(f"[daemon] {args.cmd}: no reply from {args.socket} within {args.timeout}s (raise --timeout)", file=sys.stderr)
+        return 1
+    except RuntimeError as e:
+        print(f"[daemon] {args.cmd} failed: {e}", file=sys.stderr)
+        return 1
+
+    if args.cmd == "chatbot":
+        print(result["reply"])
+    elif args.cmd == "run":
+        print(f"[run] {result['caseId']} → {result['analysisPath']}")
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm pipeline daemon (Unix socket) and client")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path (env PIPELINE_SOCKET)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("serve", help="Start the daemon (foreground)")
+    p.add_argument("--workers", type=int, default=4, help="Cases processed concurrently")
+    p.add_argument("--cache-db", default="./data/cache/stage2_cache.sqlite", help="Stage 2 verdict cache (SQLite)")
+    p.add_argument("--cache-ttl-hours", type=float, default=0, help="Expire cached verdicts after N hours (0 = never)")
+    p.add_argument("--no-cache", action="store_true", help="Always call the Stage 2 model")
+    p.add_argument("--log-level", help="DEBUG / INFO / WARNING (env PIPELINE_LOG_LEVEL, default INFO)")
+    p.add_argument("--warm", action="append", metavar="MODEL",
+                   help="Local model to load at start (repeatable; default: the --config stage models)")
+    p.add_argument("--config", help="Runtime config JSON with per-stage models (env PIPELINE_CONFIG)")
+    p.add_argument("--no-warmup", action="store_true", help="Do not pre-load local models")
+
+    p = sub.add_parser("run", help="Analyze one case (same as arbitration_pipeline.py --case-id)")
+    p.add_argument("--case-id", default="case1")
+    p.add_argument("--data-dir", default="./data/source")
+    p.add_argument("--out-dir", default="./data/analysis")
+    p.add_argument("--model", help="Stage 2 model (default: the daemon's configured stage2_model)")
+    p.add_argument("--debug-dump", action="store_true")
+    p.add_argument("--constrained", action="store_true", default=None)
+    p.add_argument("--payload", help="compact / full")
+    p.add_argument("--outcome-mode", help="tail / mapreduce")
+
+    p = sub.add_parser("chatbot", help="Initial judgement reply (same as initial_judgement_chatbot.py)")
+    p.add_argument("--case-id", default="case1")
+    p.add_argument("--data-dir", default="./data/source")
+    p.add_argument("--model", default="openai:gpt-4o-mini")
+    p.add_argument("--file", default=None)
+
+    sub.add_parser("stats", help="Daemon counters, Stage 2 cache and LLM client stats")
+    sub.add_parser("shutdown", help="Stop the daemon")
+
+    for name in ("run", "chatbot", "stats", "shutdown"):
+        sub.choices[name].add_argument("--timeout", type=float, default=None, help="Seconds to wait for the reply")
+
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        serve(args)
+    else:
+        raise SystemExit(client(args))
+
+
+if __name__ == "__main__":
+    main()
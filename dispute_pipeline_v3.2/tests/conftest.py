@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Scripts under src/ import `pipeline.*` directly; do the same here.
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
@@ -0,0 +1,79 @@
+# tests/test_analysis_cache.py
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+import app.main as api
+from app.analysis_cache import AnalysisCache
+
+
+def _write(path, data, mtime_ns=None):
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_hit_until_file_changes(tmp_path):
+    path = tmp_path / "case1_analysis.json"
+    _write(path, {"label": "SNAD"}, mtime_ns=1_700_000_000 * 10 ** 9)
+    cache = AnalysisCache()
+
+    first = cache.load(path)
+    assert cache.load(path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert json.loads(first.body) == {"label": "SNAD"}
+
+    # same size, new content and mtime (e.g. rewritten by a CLI run)
+    _write(path, {"label": "INAD"}, mtime_ns=1_700_000_060 * 10 ** 9)
+    second = cache.load(path)
+    assert cache.misses == 2
+    assert json.loads(second.body) == {"label": "INAD"}
+    assert second.etag != first.etag
+    assert second.last_modified != first.last_modified
+
+
+def test_missing_file_drops_entry(tmp_path):
+    path = tmp_path / "case1_analysis.json"
+    _write(path, {"label": "SNAD"})
+    cache = AnalysisCache()
+    cache.load(path)
+    path.unlink()
+    assert cache.load(path) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_and_store_false(tmp_path):
+    cache = AnalysisCache(max_entries=2)
+    paths = [tmp_path / f"case{i}_analysis.json" for i in range(3)]
+    for i, p in enumerate(paths):
+        _write(p, {"case": i})
+
+    cache.load(paths[0])
+    cache.load(paths[1])
+    cache.load(paths[0])            # case0 is now most recent
+    cache.load(paths[2])            # evicts case1
+    cache.load(paths[1], store=False)
+    assert cache.stats()["entries"] == 2
+    assert cache.load(paths[0]) is not None and cache.hits == 2
+    cache.load(paths[1])
+    assert cache.misses == 5        # case1 was never stored back by store=False
+
+
+def test_api_etag_revalidation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api, "analysis_cache", AnalysisCache())
+    path = tmp_path / "data" / "analysis" / "case1_analysis.json"
+    path.parent.mkdir(parents=True)
+    _write(path, {"label": "SNAD"}, mtime_ns=1_700_000_000 * 10 ** 9)
+    client = TestClient(api.app)
+
+    r = client.get("/api/analysis/case1")
+    etag = r.headers["ETag"]
+    assert r.status_code == 200 and r.json() == {"label": "SNAD"}
+    assert client.get("/api/analysis/case1", headers={"If-None-Match": etag}).status_code == 304
+
+    _write(path, {"label": "INAD"}, mtime_ns=1_700_000_060 * 10 ** 9)
+    r = client.get("/api/analysis/case1", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json() == {"label": "INAD"}
+    assert r.headers["ETag"] != etag
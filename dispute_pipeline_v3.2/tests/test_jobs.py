@@ -0,0 +1,78 @@
+# tests/test_jobs.py
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as api
+from app.jobs import DONE, FAILED, JobConflict, JobQueue
+
+
+async def _noop(job):
+    return {"ok": True}
+
+
+def test_identical_submission_is_deduplicated():
+    queue = JobQueue(_noop)
+    job, created = queue.submit("case1", {"raw": None, "model": "gemma3:1b"})
+    again, created_again = queue.submit("case1", {"model": "gemma3:1b", "raw": None})
+    assert created and not created_again
+    assert again is job
+
+
+def test_conflicting_submission_raises():
+    queue = JobQueue(_noop)
+    job, _ = queue.submit("case1", {"raw": None, "model": "gemma3:1b"})
+    with pytest.raises(JobConflict) as exc:
+        queue.submit("case1", {"raw": None, "model": "openai:gpt-4o-mini"})
+    assert exc.value.active is job
+    # other cases are independent
+    assert queue.submit("case2", {"raw": None, "model": "openai:gpt-4o-mini"})[1]
+
+
+def test_finished_job_allows_a_new_submission():
+    async def run():
+        queue = JobQueue(_noop, workers=1)
+        queue.start()
+        job, _ = queue.submit("case1", {"model": "a"})
+        await queue._queue.join()
+        assert job.status == DONE and job.result == {"ok": True}
+        nxt, created = queue.submit("case1", {"model": "b"})
+        await queue._queue.join()
+        await queue.stop()
+        return nxt, created
+
+    nxt, created = asyncio.run(run())
+    assert created and nxt.status == DONE
+
+
+def test_failed_job_records_error():
+    async def boom(job):
+        raise RuntimeError("model down")
+
+    async def run():
+        queue = JobQueue(boom, workers=1)
+        queue.start()
+        job, _ = queue.submit("case1", {"model": "a"})
+        await queue._queue.join()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == FAILED and job.error == "RuntimeError: model down"
+
+
+def test_api_returns_409_on_conflict(monkeypatch):
+    # No lifespan → no workers: submitted jobs stay queued
+    monkeypatch.setattr(api.app.state, "jobs", JobQueue(_noop), raising=False)
+    client = TestClient(api.app)
+    raw = {"id": "case1", "chatLog": []}
+
+    first = client.post("/api/analysis", json=raw)
+    dup = client.post("/api/analysis", json=raw)
+    conflict = client.post("/api/analysis", json={**raw, "chatLog": [{"sender": "Buyer"}]})
+
+    assert first.status_code == dup.status_code == 202
+    assert dup.json()["deduplicated"] and dup.json()["jobId"] == first.json()["jobId"]
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["jobId"] == first.json()["jobId"]
@@ -0,0 +1,89 @@
+# tests/test_json_repair.py
+import json
+
+import pytest
+
+from pipeline.postprocess import JsonRepairParser, repair_json
+
+
+def _parse(*chunks):
+    parser = JsonRepairParser()
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+    return parser.result(), parser
+
+
+def test_clean_object_has_no_repairs():
+    data, parser = _parse('{"a": [1, 2], "b": {"c": "x, y"}}')
+    assert data == {"a": [1, 2], "b": {"c": "x, y"}}
+    assert parser.repairs == 0
+
+
+def test_code_fence_and_prose_are_skipped_not_counted():
+    data, parser = _parse('Here you go:\n```json\n{"label": "SNAD"}\n```\nHope this helps.')
+    assert data == {"label": "SNAD"}
+    assert parser.repairs == 0
+
+
+def test_comments_are_dropped():
+    data, parser = _parse('{\n  "a": 1, // the first one\n  /* block\n  comment */ "b": "http://x/y"\n}')
+    assert data == {"a": 1, "b": "http://x/y"}
+    assert parser.repairs == 2
+
+
+def test_smart_quotes():
+    data, parser = _parse("{\u201clabel\u201d: \u201cbuyer\u2019s claim\u201d}")
+    assert data == {"label": "buyer's claim"}
+    assert parser.repairs > 0
+
+
+def test_smart_quote_inside_straight_string_is_kept_literal():
+    assert repair_json('{"q": "he said \u201chi\u201d"}') == {"q": 'he said "hi"'}
+
+
+def test_trailing_commas():
+    data, parser = _parse('{"a": [1, 2, ], "b": {"c": 3,},}')
+    assert data == {"a": [1, 2], "b": {"c": 3}}
+    assert parser.repairs == 3
+
+
+def test_raw_newline_and_tab_in_string():
+    data, parser = _parse('{"text": "line one\nline\ttwo"}')
+    assert data == {"text": "line one\nline\ttwo"}
+    assert parser.repairs == 2
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "unfinished', {"a": "unfinished"}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": {"b": "c"}, "d": [', {"a": {"b": "c"}, "d": []}),
+    ('{"a": "x\\', {"a": "x\\"}),
+])
+def test_truncated_input_is_closed(text, expected):
+    data, parser = _parse(text)
+    assert not parser.done
+    assert data == expected
+    assert parser.repairs >= 1
+
+
+def test_escape_split_across_chunks():
+    data, parser = _parse('{"a": "say \\', '"hi\\', '" ok", "b": "c:\\', '\\dir"}')
+    assert data == {"a": 'say "hi" ok', "b": "c:\\dir"}
+    assert parser.repairs == 0
+
+
+def test_close_offset_points_past_closing_brace():
+    parser = JsonRepairParser()
+    assert not parser.feed('noise {"a": ')
+    last = '{"b": 1}} and then some prose'
+    assert parser.feed(last)
+    assert last[:parser.close_offset] == '{"b": 1}}'
+    assert parser.close_offset == 9
+    assert parser.feed('{"ignored": true}')   # later chunks are ignored
+    assert json.loads(parser.text()) == {"a": {"b": 1}}
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError):
+        repair_json("no json here")
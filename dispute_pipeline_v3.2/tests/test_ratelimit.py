@@ -0,0 +1,87 @@
+# tests/test_ratelimit.py
+import pytest
+
+from pipeline import ratelimit
+from pipeline.config import BackendConfig
+from pipeline.ratelimit import BackendGovernor, TokenBucket
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture(autouse=True)
+def _fast_backoff(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(ratelimit, "_retry_after", lambda exc: 0.001)
+
+
+def test_token_bucket_refill():
+    bucket = TokenBucket(60)          # 1 token / second, burst 60
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0
+    assert bucket.wait_time(100, now + 1.0) == pytest.approx(59.0)   # capped at a full bucket
+    assert bucket.wait_time(1, now + 1000) == 0 and bucket.tokens == 60
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(None)
+    bucket.take(10 ** 9)
+    assert bucket.wait_time(10 ** 9, bucket.updated) == 0
+
+
+def test_aimd_limit_halves_on_throttle_and_grows_back():
+    gov = BackendGovernor("test", BackendConfig(max_in_flight=8, max_retries=0))
+    assert gov.limit == 8
+
+    for expected in (4, 2, 1, 1):
+        with pytest.raises(_Throttled):
+            gov.call(lambda: (_ for _ in ()).throw(_Throttled()))
+        assert gov.limit == expected
+
+    for _ in range(40):
+        assert gov.call(lambda: "ok") == "ok"
+    assert 4 < gov.limit <= 8
+    for _ in range(200):
+        gov.call(lambda: "ok")
+    assert gov.limit == 8
+    assert gov.stats()["inFlight"] == 0
+
+
+def test_retry_refunds_token_reservation():
+    gov = BackendGovernor("test", BackendConfig(tokens_per_min=1000, max_retries=3))
+    attempts = []
+
+    def flaky():
+        attempts.append(gov.tokens.tokens)
+        if len(attempts) < 3:
+            raise _Throttled()
+        return "ok"
+
+    assert gov.call(flaky, tokens=400) == "ok"
+    # every attempt saw the same balance: failed attempts gave their 400 back
+    assert attempts == pytest.approx([600, 600, 600], abs=1)
+    stats = gov.stats()
+    assert stats["retries"] == 2 and stats["throttled"] == 2 and stats["calls"] == 1
+
+
+def test_non_retryable_error_refunds_and_raises():
+    gov = BackendGovernor("test", BackendConfig(tokens_per_min=1000, max_retries=3))
+    with pytest.raises(_BadRequest):
+        gov.call(lambda: (_ for _ in ()).throw(_BadRequest()), tokens=400)
+    assert gov.tokens.tokens == pytest.approx(1000, abs=1)
+    assert gov.stats()["failed"] == 1 and gov.stats()["retries"] == 0
+
+
+def test_settle_corrects_estimate():
+    gov = BackendGovernor("test", BackendConfig(tokens_per_min=1000))
+    gov.call(lambda: "ok", tokens=400)
+    gov.settle(400, 100)
+    assert gov.tokens.tokens == pytest.approx(900, abs=1)
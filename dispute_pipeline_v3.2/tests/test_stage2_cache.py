@@ -0,0 +1,69 @@
+# tests/test_stage2_cache.py
+import pytest
+
+from pipeline import stage2_cache
+from pipeline.stage2_cache import Stage2Cache, make_cache_key
+
+PAYLOAD = {"listing": {"title": "AJ1", "price": 5200}, "complaint": "wrong size"}
+
+
+def _key(**overrides):
+    args = {"prompt_version": "v1", "prompt": "judge this", "model_name": "gemma3:1b", "payload": PAYLOAD}
+    args.update(overrides)
+    return make_cache_key(**args)
+
+
+def test_key_is_stable_across_key_order():
+    assert _key() == _key(payload={"complaint": "wrong size", "listing": {"price": 5200, "title": "AJ1"}})
+
+
+@pytest.mark.parametrize("change", [
+    {"prompt_version": "v2"},
+    {"prompt": "judge this carefully"},
+    {"model_name": "openai:gpt-4o-mini"},
+    {"decoding": "constrained"},
+    {"payload": {**PAYLOAD, "complaint": "fake item"}},
+])
+def test_key_changes_with_inputs(change):
+    assert _key(**change) != _key()
+
+
+def test_hit_and_miss(tmp_path):
+    cache = Stage2Cache(tmp_path / "c.sqlite", prompt_version="v1")
+    assert cache.get(_key()) is None
+    cache.put(_key(), "gemma3:1b", {"label": "SNAD"}, raw='{"label": "SNAD"}')
+    assert cache.get(_key()) == {"raw": '{"label": "SNAD"}', "result": {"label": "SNAD"}}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (1, 1, 1, 1)
+    cache.close()
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(stage2_cache.time, "time", lambda: now[0])
+    cache = Stage2Cache(tmp_path / "c.sqlite", prompt_version="v1", ttl_seconds=60)
+    cache.put(_key(), "gemma3:1b", {"label": "SNAD"})
+
+    now[0] += 59
+    assert cache.get(_key()) is not None
+    now[0] += 2
+    assert cache.get(_key()) is None
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["entries"] == 0   # expired entry is deleted
+    cache.close()
+
+
+def test_prompt_version_bump_purges_old_entries(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = Stage2Cache(path, prompt_version="v1")
+    cache.put(_key(), "gemma3:1b", {"label": "SNAD"})
+    cache.close()
+
+    cache = Stage2Cache(path, prompt_version="v1")
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+    cache = Stage2Cache(path, prompt_version="v2")
+    assert cache.stats()["entries"] == 0
+    assert cache.get(_key()) is None
+    cache.close()
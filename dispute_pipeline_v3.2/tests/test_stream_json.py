@@ -0,0 +1,25 @@
+# tests/test_stream_json.py
+import json
+
+from pipeline.llm_clients import read_until_object_closes
+
+
+def test_text_after_closing_brace_is_dropped():
+    text, chunks, closed = read_until_object_closes(['{"snadResult": {"label": ', '"x"}}\nExplanation', " more"])
+    assert closed
+    assert chunks == 2
+    assert text == '{"snadResult": {"label": "x"}}'
+    json.loads(text)
+
+
+def test_closing_brace_at_end_of_chunk():
+    text, _, closed = read_until_object_closes(['{"a": 1', "}", "trailing"])
+    assert closed
+    assert text == '{"a": 1}'
+
+
+def test_unclosed_stream_returns_everything():
+    text, chunks, closed = read_until_object_closes(['{"a": ', '"b"'])
+    assert not closed
+    assert chunks == 2
+    assert text == '{"a": "b"'
@@ -0,0 +1,55 @@
+# tests/test_trigger_batch.py
+import pytest
+
+from pipeline.summary_trigger import check_summary_trigger
+from pipeline.trigger_batch import check_summary_triggers_batch, chat_columns, parse_timestamps
+
+_NAT = parse_timestamps(["garbage"])[0]
+
+
+def _scalar(chats):
+    """check_summary_trigger per case, unparseable messages skipped (like the batch)."""
+    out = {}
+    for case_id, chat_log in chats.items():
+        good = [m for m in chat_log if parse_timestamps([m["timestamp"]])[0] != _NAT]
+        if not good:
+            continue
+        res = check_summary_trigger(good)
+        if res["trigger"]:
+            out[case_id] = res["reason"]
+    return out
+
+
+def _msg(sender, ts):
+    return {"sender": sender, "timestamp": ts, "text": "..."}
+
+
+CHATS = {
+    "buyer_quiet": [_msg("Buyer", "2025-10-01 10:00"), _msg("Seller", "2025-10-02 11:00")],
+    "seller_quiet": [_msg("Seller", "2025-10-01 10:00"), _msg("Buyer", "2025-10-02 11:00")],
+    "long": [_msg("Buyer", "2025-10-01 10:00")]
+    + [_msg(s, f"2025-10-0{d} 11:00") for d in (2, 3, 4) for s in ("Buyer", "Seller")],
+    "quiet_ok": [_msg("Buyer", "2025-10-01 10:00"), _msg("Seller", "2025-10-01 12:00")],
+}
+
+
+def test_batch_matches_scalar():
+    assert check_summary_triggers_batch(*chat_columns(CHATS)) == _scalar(CHATS)
+    assert set(_scalar(CHATS)) == {"buyer_quiet", "seller_quiet", "long"}
+
+
+@pytest.mark.parametrize("timestamps", [["garbage"], ["garbage", "2025-13-45 99:99"], []])
+def test_no_parseable_timestamps(timestamps):
+    case_ids = ["a"] * len(timestamps)
+    senders = ["Buyer"] * len(timestamps)
+    assert check_summary_triggers_batch(case_ids, senders, timestamps) == {}
+
+
+def test_mixed_bad_timestamps_match_scalar():
+    chats = {
+        "all_bad": [_msg("Buyer", "garbage"), _msg("Seller", "yesterday")],
+        "buyer_quiet": [_msg("Buyer", "2025-10-01 10:00"), _msg("Buyer", "??"), _msg("Seller", "2025-10-02 11:00")],
+        "quiet_ok": [_msg("Seller", "nope"), _msg("Buyer", "2025-10-01 10:00"), _msg("Seller", "2025-10-01 12:00")],
+    }
+    batch = check_summary_triggers_batch(*chat_columns(chats))
+    assert batch == _scalar(chats) == {"buyer_quiet": "buyer_inactive_24h"}
@@ -0,0 +1,86 @@
+# tests/test_trigger_service.py
+from datetime import datetime
+
+from pipeline.trigger_service import (
+    BUYER_INACTIVE,
+    CONVERSATION_LONG,
+    INACTIVITY_SECONDS,
+    SELLER_INACTIVE,
+    TriggerService,
+    parse_chat_time,
+)
+
+T0 = parse_chat_time("2025-10-01 10:00")
+HOUR = 3600
+
+
+def _msg(sender, ts):
+    return {"sender": sender, "timestamp": ts, "text": "..."}
+
+
+def _service():
+    fired = []
+    return TriggerService(on_fire=lambda case_id, reason: fired.append((case_id, reason)), clock=lambda: T0), fired
+
+
+def test_fires_in_deadline_order():
+    svc, fired = _service()
+    svc.observe("a", [_msg("Buyer", "2025-10-01 10:00"), _msg("Seller", "2025-10-01 12:00")])
+    svc.observe("b", [_msg("Seller", "2025-10-01 11:00")])
+
+    assert svc.next_deadline() == T0 + INACTIVITY_SECONDS
+    assert svc.run_due(T0 + INACTIVITY_SECONDS - 1) == []
+    svc.run_due(T0 + 100 * HOUR)
+    assert fired == [
+        ("a", BUYER_INACTIVE),        # 10-02 10:00
+        ("b", SELLER_INACTIVE),       # 10-02 11:00
+        ("a", SELLER_INACTIVE),       # 10-02 12:00
+        ("a", CONVERSATION_LONG),     # 10-04 10:00
+        ("b", CONVERSATION_LONG),     # 10-04 11:00
+    ]
+    assert svc.next_deadline() is None
+    assert svc.stats()["armedDeadlines"] == 0
+
+
+def test_new_message_supersedes_deadline():
+    svc, fired = _service()
+    svc.observe("a", [_msg("Buyer", "2025-10-01 10:00")])
+    svc.observe("a", [_msg("Buyer", "2025-10-01 20:00")])
+    stats = svc.stats()
+    assert stats["armedDeadlines"] == 2 and stats["heapEntries"] == 3   # one stale entry
+
+    # the stale 10-02 10:00 deadline is skipped, not fired
+    assert svc.run_due(T0 + INACTIVITY_SECONDS + HOUR) == []
+    assert svc.next_deadline() == T0 + 10 * HOUR + INACTIVITY_SECONDS
+    svc.run_due(T0 + 10 * HOUR + INACTIVITY_SECONDS)
+    assert fired == [("a", BUYER_INACTIVE)]
+
+
+def test_closed_case_never_fires():
+    svc, fired = _service()
+    svc.observe("a", [_msg("Buyer", "2025-10-01 10:00")])
+    svc.close("a")
+    assert svc.next_deadline() is None
+    assert svc.run_due(T0 + 100 * HOUR) == [] and fired == []
+
+
+def test_arm_past_false_skips_old_deadlines():
+    svc, fired = _service()
+    svc.clock = lambda: T0 + 30 * HOUR
+    svc.observe("a", [_msg("Buyer", "2025-10-01 10:00"), _msg("Seller", "2025-10-02 09:00")], arm_past=False)
+    assert svc.stats()["armedDeadlines"] == 2     # seller 24h + conversation 72h
+    svc.run_due(T0 + 100 * HOUR)
+    assert fired == [("a", SELLER_INACTIVE), ("a", CONVERSATION_LONG)]
+
+
+def test_heap_is_compacted_when_mostly_stale():
+    svc, fired = _service()
+    minutes = [datetime.fromtimestamp(T0 + 60 * i).strftime("%Y-%m-%d %H:%M") for i in range(1100)]
+    svc.observe("a", [_msg("Buyer", ts) for ts in minutes])
+    stats = svc.stats()
+    assert stats["armedDeadlines"] == 2 and stats["heapEntries"] == 1101
+
+    svc.run_due(T0)   # nothing due, but the stale entries are dropped
+    assert svc.stats()["heapEntries"] == 2
+    svc.run_due(T0 + 100 * HOUR)
+    assert fired == [("a", BUYER_INACTIVE), ("a", CONVERSATION_LONG)]
@@ -0,0 +1,66 @@
+# tests/test_windowing.py
+import json
+
+import pytest
+
+from pipeline import stage2_llm
+from pipeline.stage2_payload import payload_tokens
+from pipeline.windowing import estimate_tokens, window_case
+
+
+def _long_case(n=400):
+    timeline = ["2025-10-05 11:58 | Buyer: Is the size label US9?", "2025-10-05 12:00 | System: Order created"]
+    timeline += [
+        f"2025-10-06 {i // 60:02d}:{i % 60:02d} | {'Buyer' if i % 2 else 'Seller'}: message number {i} about the shoes"
+        for i in range(n)
+    ]
+    highlighted = {"timestamp": "2025-10-06 03:20", "sender": "Seller", "text": "message number 200 about the shoes"}
+    return {
+        "listingSummary": {"title": "AJ1 Chicago", "price": 5200, "attributes": {"size": "US9"}},
+        "complaintSummary": "Buyer says the size label is wrong.",
+        "highlightedIssues": [highlighted],
+        "timeline": timeline,
+        "rawListingText": "Title: AJ1 Chicago",
+        "rawChatText": "\n".join(timeline),
+    }
+
+
+@pytest.mark.parametrize("mode", ["full", "compact"])
+def test_long_case_payload_fits_budget(mode):
+    case = _long_case()
+    assert payload_tokens(case, mode) > 3000
+
+    windowed, report = window_case(case, 3000, measure=lambda c: payload_tokens(c, mode))
+
+    assert report["fits"] and report["dropped"] > 0
+    assert payload_tokens(windowed, mode) <= 3000
+    assert "2025-10-06 03:20 | Seller: message number 200 about the shoes" in windowed["timeline"]
+    assert case["timeline"] is not windowed["timeline"]   # input untouched
+
+
+def test_zero_budget_disables_windowing():
+    case = _long_case()
+    measured = []
+    windowed, report = window_case(case, 0, measure=lambda c: measured.append(c) or 0)
+    assert windowed is case
+    assert report["dropped"] == 0 and report["fits"]
+    assert measured == []   # no payload build when windowing is off
+
+
+@pytest.mark.parametrize("mode", ["full", "compact"])
+def test_stage2_prompt_stays_under_budget(monkeypatch, mode):
+    sent = {}
+
+    class _LLM:
+        def invoke(self, prompt, **kwargs):
+            sent["prompt"] = prompt
+            return '{"snadResult": {"label": "Neutral", "reason": "ok"}}'
+
+    monkeypatch.setattr(stage2_llm, "STREAM_STAGE2", False)
+    monkeypatch.setattr(stage2_llm, "_get_llm", lambda model_name: _LLM())
+
+    stage2_llm.stage2_llm_evaluate(_long_case(), "stub", payload_mode=mode, token_budget=3000)
+
+    payload = sent["prompt"].partition("\n")[2]
+    json.loads(payload)
+    assert estimate_tokens(payload) <= 3000